@@ -2,7 +2,9 @@ from collections import OrderedDict
 from typing import Optional, Dict, Tuple
 import os
 from threading import Lock, RLock
+from concurrent.futures import Future, ThreadPoolExecutor
 from .page import Page
+from .config import LRU_SKIP_FRACTION
 
 class BufferPoolManager:
     """
@@ -17,20 +19,30 @@ class BufferPoolManager:
         self.pin_counts: Dict[Tuple[str, int, int], int] = {}  # (path, page_num, col) -> pin_count
         self.dirty_pages: set[Tuple[str, int, int]] = set()  # Set of (path, page_num, col) for dirty pages
         self._lock = RLock()  # Use RLock to allow reentrant locking from same thread
+        self._promoted_at: Dict[Tuple[str, int, int], int] = {}  # (path, page_num, col) -> promotion tick when last moved to the MRU end
+        self._tick = 0  # Counts promotions, so a page's distance from the MRU end is roughly self._tick - self._promoted_at[page_id]
+        self._skip_window = max(1, int(pool_size * LRU_SKIP_FRACTION))  # Promotions a page can fall behind before a hit moves it again
+        self._write_back: Dict[Tuple[str, int, int], Tuple[Page, Future]] = {}  # Evicted dirty pages whose write may still be in flight
+        self._writer: Optional[ThreadPoolExecutor] = None  # Single background writer, so writes of a page land in order
+        self._io: Optional[ThreadPoolExecutor] = None  # Threads for batched page reads and flushes, started on first use
+        self._write_back_gen = 0  # Counts evictions, batch flushes and removals from the write-back ring, so a read made outside the lock can tell if it may be stale
         
-    def get_page(self, path: str, page_num: int, col: int = None) -> Optional[Page]:
+    def get_page(self, path: str, page_num: int, col: int = None, scan: bool = False, preloaded: Page = None) -> Optional[Page]:
         """
-        Gets a page from the bufferpool. If not in pool, loads from disk.
+        Gets a page from the bufferpool. If not in pool, loads from disk, or takes a preloaded copy read by get_pages.
         Automatically pins the page. Thread-safe.
+        Pages read by a scan are not promoted, and pages a scan loads go to the least recently used end,
+        so a scan recycles its own frames instead of evicting the working set.
         """
         with self._lock:
 
             # Check if page is already in pool
             page_id = (path, page_num, col)
             
-            # If page in pool, move to end (most recently used) and return
+            # If page in pool, move to end (most recently used) unless scanning or already near the end, and return
             if page_id in self.pages:
-                self.pages.move_to_end(page_id)
+                if not scan and self._tick - self._promoted_at.get(page_id, -self._skip_window) >= self._skip_window:
+                    self.pages.move_to_end(page_id); self._promoted_at[page_id] = self._tick; self._tick += 1
                 self.pin_counts[page_id] += 1
                 return self.pages[page_id]
                 
@@ -46,18 +58,54 @@ class BufferPoolManager:
             # If still full after attempts, force evict least recently used page
             if len(self.pages) >= self.pool_size: self._force_evict_page()
                 
-            # Load page from disk
-            page = Page(path, page_num, col)
+            # Reuse a recently evicted page, even if its write is still in flight; otherwise load the page from disk
+            pending = self._write_back.get(page_id)
+            if pending is not None: page = pending[0]
+            else: page = preloaded if preloaded is not None else Page(path, page_num, col)
             
             # Add to pool only if page exists or was created successfully
             if page is not None:
                 self.pages[page_id] = page
                 self.pin_counts[page_id] = 1
+                if scan: self.pages.move_to_end(page_id, last=False)
+                else: self._promoted_at[page_id] = self._tick; self._tick += 1
                 return page
             
             # If page is not found, return None
             return None
             
+    def get_pages(self, path: str, page_nums: list, col: int = None, scan: bool = False) -> list[Page]:
+        """
+        Gets a batch of a column's pages, reading the ones not in memory from disk concurrently.
+        Automatically pins every page. Thread-safe.
+        """
+
+        # Find the pages that have to be read from disk
+        with self._lock:
+            missing = [page_num for page_num in page_nums if (path, page_num, col) not in self.pages and (path, page_num, col) not in self._write_back]
+            gen = self._write_back_gen
+
+        # Read them concurrently without holding the lock; file reads release the GIL
+        preloaded = {}
+        if len(missing) > 1: preloaded = dict(zip(missing, self._io_pool().map(lambda page_num: Page(path, page_num, col), missing)))
+
+        # Lock the bufferpool
+        with self._lock:
+
+            # A page evicted, flushed or dropped from the write-back ring meanwhile may have been read before its write landed, so read again instead
+            if gen != self._write_back_gen: preloaded = {}
+
+            # Pin every page, adding the ones just read to the pool; get_page prefers a copy another thread added meanwhile
+            return [self.get_page(path, page_num, col, scan, preloaded.get(page_num)) for page_num in page_nums]
+
+    def _io_pool(self) -> ThreadPoolExecutor:
+        """
+        Returns the threads for batched page reads and flushes, starting them on first use. Thread-safe.
+        """
+        with self._lock:
+            if self._io is None: self._io = ThreadPoolExecutor(max_workers=8)
+            return self._io
+
     def _evict_page(self) -> bool:
         """
         Evicts the least recently used unpinned page.
@@ -71,14 +119,16 @@ class BufferPoolManager:
             # If page is unpinned, evict it
             if self.pin_counts[page_id] == 0:
 
-                # If dirty, write back to disk
+                # If dirty, write back to disk in the background
                 if page_id in self.dirty_pages:
-                    self.flush_page(page_id[0], page_id[1], page_id[2])
+                    self._write_back_page(page_id)
                     self.dirty_pages.remove(page_id)
                 
                 # Remove from pool
                 self.pages.pop(page_id)
                 self.pin_counts.pop(page_id)
+                self._promoted_at.pop(page_id, None)
+                self._write_back_gen += 1
                 return True
                 
         # If no pages can be evicted, return False
@@ -96,14 +146,53 @@ class BufferPoolManager:
         # Get least recently used page
         page_id = next(iter(self.pages))
         
-        # If dirty, write back to disk
+        # If dirty, write back to disk in the background
         if page_id in self.dirty_pages:
-            self.flush_page(page_id[0], page_id[1], page_id[2])
+            self._write_back_page(page_id)
             self.dirty_pages.remove(page_id)
         
         # Remove from pool
         self.pages.pop(page_id)
         self.pin_counts.pop(page_id)
+        self._promoted_at.pop(page_id, None)
+        self._write_back_gen += 1
+
+    def _write_back_page(self, page_id: Tuple[str, int, int]) -> None:
+        """
+        Queues an evicted dirty page for writing on the background writer, keeping it readable until the write lands.
+        Must be called with self._lock held.
+        """
+
+        # Start the writer on first use
+        if self._writer is None: self._writer = ThreadPoolExecutor(max_workers=1)
+
+        # Let a batch flush of the page land first, so this newer write cannot be overtaken by it
+        self._wait_write_back(page_id)
+
+        # Forget pages whose writes have landed once the ring outgrows the pool
+        if len(self._write_back) >= self.pool_size:
+            for pid in [pid for pid, (_, future) in self._write_back.items() if future.done()]: del self._write_back[pid]
+            self._write_back_gen += 1
+
+        # Queue the write
+        page = self.pages[page_id]
+        self._write_back[page_id] = (page, self._writer.submit(page.flush_to_disk))
+
+    def _wait_write_back(self, page_id: Tuple[str, int, int]) -> None:
+        """
+        Waits for a page's queued background write, so a newer write of the page cannot be overtaken by it.
+        Must be called with self._lock held.
+        """
+        pending = self._write_back.get(page_id)
+        if pending is not None: pending[1].result()
+
+    def _drain_write_back(self) -> None:
+        """
+        Waits for every queued background write. Must be called with self._lock held.
+        """
+        for _, future in self._write_back.values(): future.result()
+        self._write_back.clear()
+        self._write_back_gen += 1
         
     def pin_page(self, path: str, page_num: int, col: int = None) -> None:
         """
@@ -121,27 +210,54 @@ class BufferPoolManager:
         """
         Unpins a page in memory. Thread-safe.
         """
+        self.unpin_by_id((path, page_num, col))
+
+    def unpin_by_id(self, page_id: Tuple[str, int, int]) -> None:
+        """
+        Unpins a page by its (path, page_num, col) key, e.g. Page.page_id. Thread-safe.
+        """
 
         # Lock the bufferpool
         with self._lock:
 
             # Check if page is in pool and pinned
-            page_id = (path, page_num, col)
-            if page_id in self.pin_counts and self.pin_counts[page_id] > 0:
+            if self.pin_counts.get(page_id, 0) > 0:
 
                 # Decrement pin count
                 self.pin_counts[page_id] -= 1
-                
+
+    def unpin_many(self, page_ids, dirty_ids=()) -> None:
+        """
+        Marks a batch of (path, page_num, col) pages dirty, then unpins a batch, under a single lock acquisition. Thread-safe.
+        """
+
+        # Lock the bufferpool
+        with self._lock:
+
+            # Mark the written pages dirty before they can be evicted
+            self.dirty_pages.update(dirty_ids)
+
+            # Decrement the pin count of every pinned page in the batch
+            pin_counts = self.pin_counts
+            for page_id in page_ids:
+                if pin_counts.get(page_id, 0) > 0: pin_counts[page_id] -= 1
+
     def mark_dirty(self, path: str, page_num: int, col: int = None) -> None:
         """
         Marks a page as dirty. Thread-safe.
         """
+        self.mark_dirty_by_id((path, page_num, col))
+
+    def mark_dirty_by_id(self, page_id: Tuple[str, int, int]) -> None:
+        """
+        Marks a page as dirty by its (path, page_num, col) key, e.g. Page.page_id. Thread-safe.
+        """
 
         # Lock the bufferpool
         with self._lock:
 
             # Add page to dirty pages
-            self.dirty_pages.add((path, page_num, col))
+            self.dirty_pages.add(page_id)
         
     def flush_page(self, path: str, page_num: int, col: int = None) -> None:
         """
@@ -155,8 +271,9 @@ class BufferPoolManager:
             page_id = (path, page_num, col)
             if page_id in self.pages:
 
-                # Get page
+                # Get page, letting any queued write of it land first
                 page = self.pages[page_id]
+                self._wait_write_back(page_id)
 
                 # Ensure directory exists
                 os.makedirs(os.path.dirname(page.path), exist_ok=True)
@@ -164,6 +281,36 @@ class BufferPoolManager:
                 # Write page content to disk
                 page.flush_to_disk()
                 
+    def flush_batch(self, pages: list[Page]) -> None:
+        """
+        Writes a batch of pages back to disk, overlapping the writes on a few threads. Thread-safe.
+        The writes run without the bufferpool lock; until they land, the pages stay in the write-back ring so a reload finds them.
+        """
+
+        # Lock the bufferpool
+        with self._lock:
+
+            # Let any queued writes of these pages land first
+            for page in pages: self._wait_write_back(page.page_id)
+
+            # Queue the writes, keeping each page in the write-back ring until its write lands; file writes release the GIL
+            io, write_back = self._io_pool(), self._write_back
+            flushes = [(page.page_id, io.submit(page.flush_to_disk)) for page in pages]
+            for page, (page_id, future) in zip(pages, flushes): write_back[page_id] = (page, future)
+
+            # The pages are clean once written; a write made meanwhile marks its page dirty again
+            self.dirty_pages.difference_update(page_id for page_id, _ in flushes)
+            self._write_back_gen += 1
+
+        # Wait for the writes without holding the lock
+        for _, future in flushes: future.result()
+
+        # Drop the landed writes from the write-back ring, unless the page was queued again meanwhile
+        with self._lock:
+            for page_id, future in flushes:
+                if write_back.get(page_id, (None, None))[1] is future: del write_back[page_id]
+            self._write_back_gen += 1
+
     def flush_all(self) -> None:
         """
         Writes all dirty pages back to disk. Thread-safe.
@@ -172,6 +319,9 @@ class BufferPoolManager:
         # Lock the bufferpool
         with self._lock:
 
+            # Let the queued background writes land
+            self._drain_write_back()
+
             # Flush all dirty pages
             for page_id in self.dirty_pages.copy():
                 self.flush_page(page_id[0], page_id[1], page_id[2])
@@ -191,4 +341,9 @@ class BufferPoolManager:
             # Clear the bufferpool
             self.pages.clear()
             self.pin_counts.clear()
-            self.dirty_pages.clear() 
\ No newline at end of file
+            self.dirty_pages.clear()
+            self._promoted_at.clear()
+
+            # Stop the background writer and the batch threads
+            if self._writer is not None: self._writer.shutdown(wait=True); self._writer = None
+            if self._io is not None: self._io.shutdown(wait=True); self._io = None
\ No newline at end of file
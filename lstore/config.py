@@ -15,10 +15,29 @@ BUFFERPOOL_SIZE = 1000         # Number of pages in bufferpool
 BUFFERPOOL_REPLACEMENT_POLICY = 'LRU'  # Page replacement policy (LRU/MRU)
 PIN_COUNT_MAX = 100            # Maximum number of pins per page
 ENABLE_BUFFERPOOL_LOGGING = False  # Enable logging of bufferpool operations
+LRU_SKIP_FRACTION = 0.25       # Hits on pages within this most recently used fraction of the pool skip the LRU reorder
+
+# Page directory configuration
+OFFSET_BITS = 9               # Low bits of a page directory entry holding the record's slot in its page
+OFFSET_MASK = (1 << OFFSET_BITS) - 1  # Mask selecting the slot from a page directory entry
+
+# Indirection chain configuration
+MAX_CHAIN_HOPS = 1 << 16     # Longest indirection chain followed, guarding against a corrupted chain that loops
+
+# Scan configuration
+SCAN_BATCH_PAGES = 64         # Pages a directory scan pins and reads from disk together
 
 # Page range configuration
 MAX_BASE_PAGES = 16           # Maximum number of base pages per page range
 
+# Lock configuration
+LOCK_MANAGER_SHARDS = 16      # Lock manager shards; each record's locks live in one shard, chosen by hashing (table, key)
+LOCK_WAIT_TIMEOUT = 2.0       # Seconds a transaction waits for a conflicting record lock before aborting
+WORKER_POOL_SIZE = 32         # Most transaction worker threads running at once; threads are started on demand and reused
+
+# Logging configuration
+LOG_GROUP_COMMIT_SIZE = 64    # Queued transaction log entries that force a write before the next commit/abort
+
 # Merge configuration
 MERGE_TRIGGER_COUNT = 2000    # Number of updates before triggering merge
 MERGE_THRESHOLD = 0.2         # Percentage of records that need to be updated to trigger merge
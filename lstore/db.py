@@ -66,7 +66,7 @@ class Database:
 
                         # If page is dirty, flush it
                         page = table.page_range[col][page_num]
-                        if page.is_dirty:
+                        if page is not None and page.is_dirty:
                             page.flush_to_disk()
                             self.bufferpool.unpin_page(self.path, page_num, col)
         
@@ -1,5 +1,6 @@
 from BTrees._OOBTree import OOBTree
 from threading import RLock
+from lstore.config import OFFSET_BITS, OFFSET_MASK
 
 class Index:
     """
@@ -42,8 +43,8 @@ class Index:
         Get value using RID from BTree. Thread-safe.
         """
         with self._lock:
-            if column_number < len(self.indices) and self.indices[column_number] is not None and rid in self.indices[column_number]:
-                return self.indices[column_number][rid]
+            if column_number < len(self.indices) and self.indices[column_number] is not None:
+                return self.indices[column_number].get(rid)
             return None
 
     def get_rid_in_col_by_value(self, column_number: int, value: int) -> list:
@@ -111,6 +112,23 @@ class Index:
             # Add or update record
             self.indices[column_number][rid] = value
 
+    def add_or_move_record_row(self, rid: int, values, first_column: int):
+        """
+        Add or update a record's values for consecutive columns starting at first_column under a single lock acquisition. Thread-safe.
+        """
+
+        # Lock the index
+        with self._lock:
+
+            # Extend indices list if needed
+            last_column = first_column + len(values) - 1
+            if last_column >= len(self.indices): self.indices.extend([None] * (last_column - len(self.indices) + 1))
+
+            # Add or update the record in each column's index, creating the index if it doesn't exist
+            for column_number, value in enumerate(values, first_column):
+                if self.indices[column_number] is None: self.create_index(column_number)
+                self.indices[column_number][rid] = value
+
     def delete_record(self, column_number: int, rid: int) -> bool:
         """
         Delete a record from the BTree index. Thread-safe.
@@ -147,7 +165,7 @@ class Index:
                     self.indices[i] = OOBTree()
 
                     # Add records to index
-                    for k, v in self.table.page_directory[i].items(): self.indices[i][k] = self.table.read_page(v[0], v[1])
+                    for k, v in self.table.page_directory[i].items(): self.indices[i][k] = self.table.read_page(v >> OFFSET_BITS, v & OFFSET_MASK, i)
             
     def restart_index_by_col(self, col):
         """
@@ -164,4 +182,4 @@ class Index:
             if self.indices[col] is None: self.indices[col] = OOBTree()
 
             # Add records to index
-            for k, v in self.table.page_directory[col].items(): self.indices[col][k] = self.table.read_page(v[0], v[1])
\ No newline at end of file
+            for k, v in self.table.page_directory[col].items(): self.indices[col][k] = self.table.read_page(v >> OFFSET_BITS, v & OFFSET_MASK, col)
\ No newline at end of file
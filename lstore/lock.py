@@ -1,6 +1,9 @@
-from threading import Lock
+from threading import Condition, Lock
+from time import monotonic
+from contextlib import contextmanager
 from typing import Dict, Set, Tuple
 from enum import Enum
+from lstore.config import LOCK_MANAGER_SHARDS
 
 class LockType(Enum):
     SHARED = 0      # For reads
@@ -10,52 +13,71 @@ class LockManager:
     def __init__(self):
         self._lock_dict: Dict[Tuple[str, int], Dict[int, LockType]] = {}  # (table_name, rid) -> {transaction_id: lock_type}
         self._manager_lock = Lock()  # For thread-safe lock dictionary access
+        self._held: Dict[int, Set[Tuple[str, int]]] = {}  # transaction_id -> {(table_name, rid)} it holds locks on
+        self._released = Condition(self._manager_lock)  # Notified whenever locks are released, for waiting acquirers
 
-    def acquire_lock(self, table_name: str, rid: int, transaction_id: int, lock_type: LockType) -> bool:
+    def acquire_lock(self, table_name: str, rid: int, transaction_id: int, lock_type: LockType, wait: float = 0.0) -> bool:
         """
-        Attempts to acquire a lock for a transaction. Returns immediately if lock cannot be granted (No Wait policy).
+        Attempts to acquire a lock for a transaction. By default returns immediately if lock cannot be granted (No Wait policy);
+        with a positive wait, blocks for up to that many seconds until a release lets the lock be granted.
         Returns True if lock acquired, False if should abort.
         """
         with self._manager_lock:
-            key = (table_name, rid)
-            
-            # If record has no locks yet, create new entry
-            if key not in self._lock_dict:
-                self._lock_dict[key] = {transaction_id: lock_type}
-                return True
 
-            # Get current locks
-            current_locks = self._lock_dict[key]
+            # Try to grant the lock, then retry after each release until granted or the wait runs out
+            granted, deadline = self._grant(table_name, rid, transaction_id, lock_type), monotonic() + wait
+            while not granted:
+                remaining = deadline - monotonic()
+                if remaining <= 0 or not self._released.wait(remaining): break
+                granted = self._grant(table_name, rid, transaction_id, lock_type)
+
+            # Return whether the lock was granted
+            return granted
+
+    def _grant(self, table_name: str, rid: int, transaction_id: int, lock_type: LockType) -> bool:
+        """
+        Grants the lock if it is compatible with the locks held on the record. Must be called with self._manager_lock held.
+        """
+        key = (table_name, rid)
+        
+        # If record has no locks yet, create new entry
+        if key not in self._lock_dict:
+            self._lock_dict[key] = {transaction_id: lock_type}
+            self._held.setdefault(transaction_id, set()).add(key)
+            return True
+
+        # Get current locks
+        current_locks = self._lock_dict[key]
 
-            # If transaction already has the lock, check for upgrade
-            if transaction_id in current_locks:
+        # If transaction already has the lock, check for upgrade
+        if transaction_id in current_locks:
 
-                # If already has the requested lock, return True
-                if current_locks[transaction_id] == lock_type: return True
+            # If already has the requested lock, return True
+            if current_locks[transaction_id] == lock_type: return True
 
-                # If can upgrade, upgrade lock
-                if current_locks[transaction_id] == LockType.SHARED and lock_type == LockType.EXCLUSIVE:
+            # If can upgrade, upgrade lock
+            if current_locks[transaction_id] == LockType.SHARED and lock_type == LockType.EXCLUSIVE:
 
-                    # Can only upgrade if no other transactions hold shared locks
-                    if len(current_locks) == 1: current_locks[transaction_id] = LockType.EXCLUSIVE; return True
-                    return False  # Must abort - can't upgrade with other shared locks
+                # Can only upgrade if no other transactions hold shared locks
+                if len(current_locks) == 1: current_locks[transaction_id] = LockType.EXCLUSIVE; return True
+                return False  # Must abort - can't upgrade with other shared locks
 
-            # Check if lock can be granted based on current locks
-            if lock_type == LockType.SHARED:
+        # Check if lock can be granted based on current locks
+        if lock_type == LockType.SHARED:
 
-                # Can get shared lock if no exclusive locks exist
-                if any(lt == LockType.EXCLUSIVE for lt in current_locks.values()): return False
+            # Can get shared lock if no exclusive locks exist
+            if any(lt == LockType.EXCLUSIVE for lt in current_locks.values()): return False
 
-                # Add shared lock
-                current_locks[transaction_id] = LockType.SHARED; return True
-            
-            else:  # Exclusive lock
+            # Add shared lock
+            current_locks[transaction_id] = LockType.SHARED; self._held.setdefault(transaction_id, set()).add(key); return True
+        
+        else:  # Exclusive lock
 
-                # Can only get exclusive lock if no other locks exist
-                if len(current_locks) > 0: return False
+            # Can only get exclusive lock if no other locks exist
+            if len(current_locks) > 0: return False
 
-                # Add exclusive lock
-                current_locks[transaction_id] = LockType.EXCLUSIVE; return True
+            # Add exclusive lock
+            current_locks[transaction_id] = LockType.EXCLUSIVE; self._held.setdefault(transaction_id, set()).add(key); return True
 
     def release_lock(self, table_name: str, rid: int, transaction_id: int) -> None:
         """
@@ -73,10 +95,14 @@ class LockManager:
 
                 # Remove transaction_id
                 del self._lock_dict[key][transaction_id]
+                self._held.get(transaction_id, set()).discard(key)
 
                 # If no more locks on this record, remove record
                 if not self._lock_dict[key]: del self._lock_dict[key]
 
+                # Wake any waiting acquirers
+                self._released.notify_all()
+
     def release_all_locks(self, transaction_id: int) -> None:
         """
         Releases all locks held by a transaction (used during abort/commit).
@@ -85,20 +111,94 @@ class LockManager:
         # Lock the lock manager
         with self._manager_lock:
 
-            # Get keys to delete
-            keys_to_delete = []
+            # Iterate through just the records the transaction holds locks on
+            for key in self._held.pop(transaction_id, ()):
 
-            # Iterate through records
-            for key in self._lock_dict:
+                # Remove transaction_id
+                current_locks = self._lock_dict[key]
+                del current_locks[transaction_id]
+
+                # If no more locks on this record, remove record
+                if not current_locks: del self._lock_dict[key]
+
+            # Wake any waiting acquirers
+            self._released.notify_all()
+
+class ShardedLockManager:
+    """
+    Splits the lock table across LockManager shards by (table_name, rid), so transactions on different records
+    rarely contend on the same manager lock. Each record lives in exactly one shard, so locking behaves as with a single LockManager.
+    """
+    def __init__(self, num_shards: int = LOCK_MANAGER_SHARDS):
+        self._shards = [LockManager() for _ in range(num_shards)]
+
+    def _shard(self, table_name: str, rid: int) -> LockManager:
+        """
+        Returns the shard holding the record's locks
+        """
+        return self._shards[hash((table_name, rid)) % len(self._shards)]
+
+    def acquire_lock(self, table_name: str, rid: int, transaction_id: int, lock_type: LockType, wait: float = 0.0) -> bool:
+        """
+        Attempts to acquire a lock for a transaction in the record's shard, waiting up to wait seconds.
+        Returns True if lock acquired, False if should abort.
+        """
+        return self._shard(table_name, rid).acquire_lock(table_name, rid, transaction_id, lock_type, wait)
 
-                # If transaction_id in record, remove it
-                if transaction_id in self._lock_dict[key]:
+    def release_lock(self, table_name: str, rid: int, transaction_id: int) -> None:
+        """
+        Releases all locks held by transaction_id on the specified record.
+        """
+        self._shard(table_name, rid).release_lock(table_name, rid, transaction_id)
+
+    def release_all_locks(self, transaction_id: int) -> None:
+        """
+        Releases all locks held by a transaction in every shard (used during abort/commit).
+        """
+        for shard in self._shards: shard.release_all_locks(transaction_id)
+
+class RWLock:
+    """
+    Reader-writer lock: any number of readers or a single writer. Waiting writers block new readers so they are not starved.
+    Not reentrant.
+    """
+    def __init__(self):
+        self._cond = Condition(Lock())  # Guards the counters below
+        self._readers = 0               # Number of active readers
+        self._writer = False            # Whether a writer holds the lock
+        self._writers_waiting = 0       # Number of writers waiting for the lock
+
+    @contextmanager
+    def read(self):
+        """
+        Holds the lock for reading for the duration of a with block
+        """
+
+        # Wait until no writer holds or is waiting for the lock
+        with self._cond:
+            while self._writer or self._writers_waiting: self._cond.wait()
+            self._readers += 1
+
+        # Run the block, then wake waiting writers once the last reader leaves
+        try: yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers: self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        """
+        Holds the lock for writing for the duration of a with block
+        """
 
-                    # Remove transaction_id
-                    del self._lock_dict[key][transaction_id]
+        # Wait until there are no readers and no other writer
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers: self._cond.wait()
+            self._writers_waiting -= 1; self._writer = True
 
-                    # If no more locks on this record, add to keys to delete
-                    if not self._lock_dict[key]: keys_to_delete.append(key)
-            
-            # Delete records with no locks
-            for key in keys_to_delete: del self._lock_dict[key] 
\ No newline at end of file
+        # Run the block, then wake everyone waiting
+        try: yield
+        finally:
+            with self._cond: self._writer = False; self._cond.notify_all()
@@ -1,8 +1,10 @@
 import os
 import json
 import time
+import atexit
 from threading import RLock
 from datetime import datetime
+from lstore.config import LOG_GROUP_COMMIT_SIZE
 
 class Logger:
     """
@@ -24,8 +26,31 @@ class Logger:
             self.transaction_log = os.path.join(self.log_dir, "transaction.log")
             self.recovery_log = os.path.join(self.log_dir, "recovery.log")
             os.makedirs(self.log_dir, exist_ok=True)
+            self._pending = []  # Transaction log lines not yet written, flushed together at commit/abort
+            self._file = None   # Transaction log kept open for appending
+            self._recovery_file = None  # Recovery log kept open for appending
+            atexit.register(self.flush)
             self._initialized = True
             
+    def build_entry(self, transaction_id: int, operation: str, table: str, key: int, columns=None, values=None) -> str:
+        """
+        Build a transaction log line, so a transaction can buffer its entries and log them together
+        """
+
+        # Create log entry
+        log_entry = {
+            "timestamp": time.time(),
+            "transaction_id": transaction_id,
+            "operation": operation,
+            "table": table,
+            "key": key,
+            "columns": columns,
+            "values": values
+        }
+
+        # Return the log line
+        return json.dumps(log_entry) + "\n"
+
     def log_transaction(self, transaction_id: int, operation: str, table: str, key: int, columns=None, values=None):
         """
         Log transaction operations for recovery
@@ -34,19 +59,38 @@ class Logger:
         # Lock the logger
         with self._lock:
 
-            # Create log entry
-            log_entry = {
-                "timestamp": time.time(),
-                "transaction_id": transaction_id,
-                "operation": operation,
-                "table": table,
-                "key": key,
-                "columns": columns,
-                "values": values
-            }
+            # Queue the entry, writing the queued entries as one group at commit/abort or once enough have built up
+            self._pending.append(self.build_entry(transaction_id, operation, table, key, columns, values))
+            if operation in ("commit", "abort") or len(self._pending) >= LOG_GROUP_COMMIT_SIZE: self.flush()
+
+    def log_entries(self, entries: list):
+        """
+        Log a transaction's buffered entries, built by build_entry, in one write
+        """
 
-            # Write to transaction log
-            with open(self.transaction_log, "a") as f: f.write(json.dumps(log_entry) + "\n")
+        # Lock the logger
+        with self._lock:
+
+            # Queue the entries and write them with anything else queued
+            self._pending.extend(entries); self.flush()
+
+    def flush(self):
+        """
+        Write the queued transaction log entries in one write
+        """
+
+        # Lock the logger
+        with self._lock:
+
+            # If nothing is queued, return
+            if not self._pending: return
+
+            # Open the transaction log on first use
+            if self._file is None: self._file = open(self.transaction_log, "a")
+
+            # Write and flush the queued entries together
+            self._file.write("".join(self._pending)); self._file.flush()
+            self._pending.clear()
                 
     def log_recovery_point(self):
         """
@@ -62,8 +106,9 @@ class Logger:
                 "datetime": datetime.now().isoformat()
             }
 
-            # Write to recovery log
-            with open(self.recovery_log, "a") as f: f.write(json.dumps(recovery_point) + "\n")
+            # Write to recovery log, opening it on first use rather than once per commit
+            if self._recovery_file is None: self._recovery_file = open(self.recovery_log, "a")
+            self._recovery_file.write(json.dumps(recovery_point) + "\n"); self._recovery_file.flush()
                 
     def get_transactions_since(self, timestamp: float):
         """
@@ -73,8 +118,9 @@ class Logger:
         # Lock the logger
         with self._lock:
 
-            # Get transactions
+            # Get transactions, including the queued ones
             transactions = []
+            self.flush()
 
             # If transaction log exists, read it
             if os.path.exists(self.transaction_log):
@@ -102,6 +148,11 @@ class Logger:
         # Lock the logger
         with self._lock:
 
+            # Drop the queued entries and close the transaction and recovery logs
+            self._pending.clear()
+            if self._file is not None: self._file.close(); self._file = None
+            if self._recovery_file is not None: self._recovery_file.close(); self._recovery_file = None
+
             # Clear transaction log
             if os.path.exists(self.transaction_log): os.remove(self.transaction_log)
             
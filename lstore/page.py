@@ -1,24 +1,38 @@
-import os
-from typing import Optional, List
+import os, sys
+from array import array
+from typing import Optional
+
+# Records are stored big-endian on disk, so native little-endian buffers need a byte swap
+_SWAP_BYTES = sys.byteorder == 'little'
+
+# Column data directory prefix per table path, so page paths are built without os.path.join
+_DATA_DIR_PREFIX = {}
 
 class Page:
     """
     Represents a page of data in the database.
     Handles both in-memory and disk operations.
     """
+    __slots__ = ('capacity', 'max_records', 'page_num', 'col', 'page_id', 'path', 'data', 'n', 'is_dirty')
+
     def __init__(self, currentpath: str, pagenum: int, col: int = None):
         self.capacity = 4096    # Page capacity
+        self.max_records = self.capacity // 8 - 1  # Records that fit alongside the 8-byte header
         self.page_num = pagenum # Page number
         self.col = col          # Column number
+        self.page_id = (currentpath, pagenum, col)  # Bufferpool key, built once per page
         
         # Use column-specific path if column is provided
-        if col is not None: self.path = os.path.join(currentpath, "data", f"{col}_{str(self.page_num)}.bin")
+        if col is not None:
+            prefix = _DATA_DIR_PREFIX.get(currentpath)
+            if prefix is None: prefix = _DATA_DIR_PREFIX[currentpath] = os.path.join(currentpath, "data", "")
+            self.path = f"{prefix}{col}_{self.page_num}.bin"
 
         # Use page-specific path if column is not provided
         else: self.path = os.path.join(currentpath, f"{str(self.page_num)}.bin")
 
-        # Initialize data
-        self.data: List[int] = []; self.is_dirty = False
+        # Initialize data as a contiguous buffer of 64-bit integers, with its record count kept in n
+        self.data = array('q'); self.n = 0; self.is_dirty = False
         
         # Create directory if it doesn't exist
         os.makedirs(os.path.dirname(self.path), exist_ok=True)
@@ -29,6 +43,22 @@ class Page:
         # Create empty file if it doesn't exist
         else: self.flush_to_disk()
 
+    def __setstate__(self, state) -> None:
+        """
+        Restores a pickled page, including pages pickled as a plain dict before __slots__
+        """
+
+        # Slotted pages pickle as (None, slots), older pages as a dict
+        if isinstance(state, tuple): state = state[1]
+        for name, value in state.items(): setattr(self, name, value)
+
+        # Fill in the fields older pages were pickled without
+        if not hasattr(self, 'max_records'): self.max_records = self.capacity // 8 - 1
+        if not hasattr(self, 'n'): self.n = len(self.data)
+        if not hasattr(self, 'page_id'):
+            table_path = os.path.dirname(os.path.dirname(self.path) if self.col is not None else self.path)
+            self.page_id = (table_path, self.page_num, self.col)
+
     def _load_from_disk(self) -> None:
         """
         Loads page data from disk
@@ -38,33 +68,33 @@ class Page:
         """
 
         # Initialize data
-        self.data = []
+        self.data = array('q')
 
         # Try to load data from disk
         try:
-            with open(self.path, 'rb') as file:
+            with open(self.path, 'rb') as file: raw = file.read()
 
-                # Read number of records
-                num_records_bytes = file.read(8); 
-
-                # If invalid header, print warning and return
-                if len(num_records_bytes) != 8: print(f"Warning: Invalid header in {self.path}"); return
-                    
-                # Get number of records
-                num_records = int.from_bytes(num_records_bytes, byteorder='big')
+            # If invalid header, print warning and return
+            if len(raw) < 8: print(f"Warning: Invalid header in {self.path}"); return
                 
-                # Read each record
-                for _ in range(num_records):
-                    value_bytes = file.read(8)
+            # Get number of records
+            num_records = int.from_bytes(raw[:8], byteorder='big')
+
+            # Get the record bytes
+            body = raw[8:8 + num_records * 8]
 
-                    # If truncated record, print warning and break
-                    if len(value_bytes) != 8: print(f"Warning: Truncated record in {self.path}"); break
+            # If truncated record, print warning and keep the complete records
+            if len(body) != num_records * 8: print(f"Warning: Truncated record in {self.path}"); body = body[:len(body) - len(body) % 8]
 
-                    # Add record to data
-                    self.data.append(int.from_bytes(value_bytes, byteorder='big'))
+            # Copy all records into the buffer at once
+            self.data.frombytes(body)
+            if _SWAP_BYTES: self.data.byteswap()
 
         # If error, print warning and return empty data
-        except Exception as e: print(f"Error loading page {self.path}: {e}"); self.data = []
+        except Exception as e: print(f"Error loading page {self.path}: {e}"); self.data = array('q')
+
+        # Set the record count
+        self.n = len(self.data)
 
     def flush_to_disk(self) -> None:
         """
@@ -76,13 +106,13 @@ class Page:
 
         # Try to write data to disk
         try:
-            with open(self.path, 'wb') as file:
 
-                # Write number of records
-                file.write(len(self.data).to_bytes(8, byteorder='big'))
-                
-                # Write each record
-                for value in self.data: file.write(value.to_bytes(8, byteorder='big'))
+            # Encode the records in on-disk byte order
+            body = array('q', self.data)
+            if _SWAP_BYTES: body.byteswap()
+
+            # Write the header and the records in a single call
+            with open(self.path, 'wb') as file: file.write(self.n.to_bytes(8, byteorder='big') + body.tobytes())
 
             # Set dirty flag to false
             self.is_dirty = False
@@ -94,7 +124,7 @@ class Page:
         """
         Returns number of records in the page
         """
-        return len(self.data)
+        return self.n
     
     def has_capacity(self) -> bool:
         """
@@ -102,7 +132,7 @@ class Page:
         Accounts for both record count header and record data
         """
         # 8 bytes for number of records + 8 bytes per record
-        return (len(self.data) + 1) * 8 < self.capacity
+        return self.n < self.max_records
 
     def write(self, value: int) -> bool:
         """
@@ -122,7 +152,7 @@ class Page:
                 print(f"Warning: Non-integer value {value} being written to {self.path}"); value = 0
         
         # Add value to data and set dirty flag to true
-        self.data.append(value); self.is_dirty = True
+        self.data.append(value); self.n += 1; self.is_dirty = True
 
         # Return true
         return True
@@ -133,7 +163,7 @@ class Page:
         """
 
         # If index is out of bounds, return None
-        if index >= len(self.data): return None
+        if index >= self.n: return None
 
         # Return value
         return self.data[index]
@@ -142,7 +172,7 @@ class Page:
         """
         Updates a value in the page
         """
-        if index >= len(self.data):
+        if index >= self.n:
             return False
             
         # Ensure value is an integer
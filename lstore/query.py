@@ -64,23 +64,14 @@ class Query:
         # If there are versions and the relative version is not 0
         if self.table.versions and relative_version !=0:
 
-            # Set the table to history mode
-            self.table.is_history = True
-
-            # Copy the current page directory to a variable
-            current = [{k:[v[0], v[1]] for k,v in col.items()} for col in self.table.page_directory]
-
-            # Set the page directory to the version specified by relative_version
-            self.table.page_directory = [{k:[v[0], v[1]] for k,v in col.items()} for col in self.table.versions[(len(self.table.versions)+relative_version)]]
+            # Switch the table to the version specified by relative_version
+            self.table.select_version(len(self.table.versions) + relative_version)
             
             # Select the records from the version
             records = self.select(search_key, search_key_index, projected_columns_index)
 
-            # Set the page directory back to the original
-            self.table.page_directory = [{k:[v[0], v[1]] for k,v in col.items()} for col in current]
-
-            # Set the table to not in history mode
-            self.table.is_history = False
+            # Switch the table back to the current version
+            self.table.select_current()
 
         # If no version is specified, select the records from the current version
         else: records = self.table.read_records(search_key_index, search_key, projected_columns_index)
@@ -148,23 +139,14 @@ class Query:
         # If there are versions and the relative version is not 0, sum the values from the specified version
         if self.table.versions and relative_version != 0:
 
-            # Copy the current page directory to a variable
-            current = [{k:[v[0], v[1]] for k,v in col.items()} for col in self.table.page_directory]
-
-            # Set the table to history mode
-            self.table.is_history = True
-
-            # Set the page directory to the version specified by relative_version
-            self.table.page_directory = [{k:[v[0], v[1]] for k,v in col.items()} for col in self.table.versions[(len(self.table.versions)+relative_version)]]
+            # Switch the table to the version specified by relative_version
+            self.table.select_version(len(self.table.versions) + relative_version)
 
             # Sum the values of the aggregate column over the range of records from the specified version
             sum = self.sum(start_range, end_range, aggregate_column_index)
 
-            # Set the page directory back to the original
-            self.table.page_directory = [{k:[v[0], v[1]] for k,v in col.items()} for col in current]
-
-            # Set the table to not in history mode
-            self.table.is_history = False
+            # Switch the table back to the current version
+            self.table.select_current()
 
         # Return the sum of the values
         return sum
@@ -2,9 +2,14 @@ from lstore.index import Index
 from time import time
 from lstore.page import Page
 from lstore.bufferpool import BufferPoolManager
-import json, os
-from lstore.config import MERGE_TRIGGER_COUNT, INDIRECTION_COLUMN, RID_COLUMN, TIMESTAMP_COLUMN, SCHEMA_ENCODING_COLUMN
-from threading import RLock
+import json, os, pickle
+from lstore.config import MERGE_TRIGGER_COUNT, INDIRECTION_COLUMN, RID_COLUMN, TIMESTAMP_COLUMN, SCHEMA_ENCODING_COLUMN, OFFSET_BITS, OFFSET_MASK, SCAN_BATCH_PAGES, MAX_CHAIN_HOPS
+from threading import Lock
+from lstore.lock import RWLock
+from itertools import count
+from bisect import bisect_right
+from collections import defaultdict
+from contextlib import contextmanager
 
 class Record:
     def __init__(self, rid: int, key: int, columns: int):
@@ -14,6 +19,22 @@ class Record:
 
     def __str__(self): return f"Record(rid={self.rid}, key={self.key}, columns={self.columns})"
 
+def _pack_directory(col_dirs: list) -> list:
+    """
+    Converts per-column directories holding [page_num, offset] lists or (page_num, offset) tuples, as older tables stored them, to packed entries
+    """
+    packed = []
+    for col in col_dirs:
+
+        # Keep columns whose entries are all packed already, so columns shared with snapshots stay shared
+        if all(type(loc) is int for loc in col.values()): packed.append(col)
+
+        # Otherwise, pack every unpacked entry as page_num << OFFSET_BITS | offset
+        else: packed.append({rid: (loc[0] << OFFSET_BITS) | loc[1] if isinstance(loc, (tuple, list)) else loc for rid, loc in col.items()})
+
+    # Return the packed directory
+    return packed
+
 class Table:
     """
     Represents a table in the database
@@ -38,11 +59,12 @@ class Table:
         self.metadata_columns = 4  # Number of metadata columns
         self.total_columns = self.num_columns + self.metadata_columns
         
-        # Initialize page ranges
-        self.base_pages_per_range = 16
-        self.current_page_range = 0
-        self.page_ranges = []  # List of page ranges
-        
+        # Indirection chain per record, reused while the record's head pointer and the chain's indirection entries are unchanged
+        self._chain_cache = {}
+
+        # Current open insert page per column
+        self._open_pages = [None] * self.total_columns
+
         # Initialize page ranges for both data and metadata columns
         for i in range(self.total_columns):
             self.page_range.append(dict())
@@ -54,10 +76,16 @@ class Table:
         # Initialize table attributes
         self.is_history = False
         self.used = False
-        self.update_count = 0  # Track number of updates
+        self._init_update_counter()  # Track number of updates
+        self._ts_counter = count(int(time()) << 20)  # Record timestamps: start-up seconds, then a per-record sequence
         self.last_page_number = self.total_columns * 16 + self.total_columns
-        self.version_lock = RLock()  # Add lock for version management
+        self.version_lock = RWLock()  # Reader-writer lock for version management
         self.version_timestamps = []  # Track version timestamps
+        self._version_view = (self.versions, self.version_timestamps)  # Published (versions, timestamps) pair that readers use without locking
+        self._live_page_directory = None  # Live page directory while a version is selected
+        self._live_pd_shared = None  # Live directory sharing flags while a version is selected
+        self._pd_shared = [False] * self.total_columns  # Columns whose directory is shared with a version snapshot
+        self._dir_locks = [Lock() for _ in range(self.total_columns)]  # Per-column locks for page slots and directory entries
 
     def __getstate__(self):
         """
@@ -65,7 +93,8 @@ class Table:
         Remove unpicklable objects (bufferpool and locks)
         """
         state = self.__dict__.copy()
-        state['bufferpool'], state['version_lock'] = None, None # Don't pickle the bufferpool and locks
+        state['bufferpool'], state['version_lock'], state['_dir_locks'] = None, None, None # Don't pickle the bufferpool and locks
+        state['_update_counter'], state['_ts_counter'] = None, None # Counters are rebuilt on load
         return state
         
     def __setstate__(self, state):
@@ -77,8 +106,16 @@ class Table:
         # Update the dictionary
         self.__dict__.update(state)
 
-        # Reinitialize the lock
-        self.version_lock = RLock()
+        # Reinitialize the locks
+        self.version_lock = RWLock()
+        self._dir_locks = [Lock() for _ in range(self.total_columns)]
+
+        # Restart the timestamp counter from the current time
+        self._ts_counter = count(int(time()) << 20)
+
+        # Rebuild the update counter, taking the plain update count from older pickles
+        if '_last_update' in state: self._init_update_counter(self._last_update, self._merge_base)
+        else: self._init_update_counter(self.__dict__.pop('update_count', 0))
 
         # Ensure index is properly initialized
         if hasattr(self, 'index') and self.index is not None: self.index._initialize_after_load()
@@ -92,28 +129,68 @@ class Table:
         self.bufferpool = bufferpool
 
         # Initialize the version lock
-        if not hasattr(self, 'version_lock') or self.version_lock is None: self.version_lock = RLock()
+        if not hasattr(self, 'version_lock') or self.version_lock is None: self.version_lock = RWLock()
 
         # Initialize the version timestamps
         if not hasattr(self, 'version_timestamps'): self.version_timestamps = []
 
+        # Pack page directory entries pickled as [page_num, offset] lists or (page_num, offset) tuples
+        self.page_directory = _pack_directory(self.page_directory)
+        self.versions = [_pack_directory(version) for version in self.versions]
+        self._version_view = (self.versions, self.version_timestamps)
+
+        # Start with an empty indirection chain cache; older pickles hold bare chains without their entries
+        self._chain_cache = {}
+
+        # Initialize the open page hints
+        if not hasattr(self, '_open_pages'): self._open_pages = [None] * self.total_columns
+
+        # Treat every column directory as shared with a snapshot until its first write
+        if not hasattr(self, '_pd_shared'): self._pd_shared = [True] * self.total_columns
+        if not hasattr(self, '_live_pd_shared'): self._live_pd_shared = None
+
+        # Initialize the per-column directory locks
+        if getattr(self, '_dir_locks', None) is None: self._dir_locks = [Lock() for _ in range(self.total_columns)]
+
         # Initialize the index if it exists
         if hasattr(self, 'index') and self.index is not None: self.index._initialize_after_load()
 
         # Otherwise, create a new index
         else: self.index = Index(self); self.index.create_index(self.key_col)
 
-    def _get_page(self, col: int, page_num: int) -> Page:
+    def _init_update_counter(self, last_update: int = 0, merge_base: int = 0):
+        """
+        Set up the update counter; next() on itertools.count is atomic under the GIL, so updates need no lock to count
+        """
+        self._update_counter = count(last_update + 1)
+        self._last_update, self._merge_base = last_update, merge_base
+
+    @property
+    def update_count(self) -> int:
         """
-        Gets a page from the bufferpool
+        Number of updates since the last merge
+        """
+        return self._last_update - self._merge_base
+
+    @update_count.setter
+    def update_count(self, value: int):
+        self._merge_base = self._last_update - value
+
+    def _get_page(self, col: int, page_num: int, scan: bool = False) -> Page:
+        """
+        Gets a page from the bufferpool, flagging pages read by full-column scans
         """
         # Get the page from the bufferpool, which will load it from disk if needed
-        page = self.bufferpool.get_page(self.path, page_num, col)
+        page = self.bufferpool.get_page(self.path, page_num, col, scan)
 
         # If the page is not found, return None
         if page is None: return None
 
-        # Otherwise, return the page
+        # Keep the loaded copy of a registered page, e.g. one restart_table registered as None, so save and close flush it
+        col_pages = self.page_range[col]
+        if col_pages.get(page_num, page) is not page: col_pages[page_num] = page
+
+        # Return the page
         return page
 
     def create_meta_data(self):
@@ -130,102 +207,137 @@ class Table:
         # Create data directory if it doesn't exist
         os.makedirs(os.path.join(self.path, "data"), exist_ok=True)
         
-        # Initialize base pages for each column
+        # Initialize the 16 base pages and the first tail page of each column, fetching a column's pages in one batch
         for col in range(self.total_columns):
-            for i in range(1, 17):  # 16 base pages per column
-                page = self._get_page(col, i)
-                self.page_range[col][i] = page
-                self.bufferpool.unpin_page(page.path, page.page_num)
-            
-            # Create initial tail page for each column
-            tail_page = self._get_page(col, 17)  # First tail page after base pages
-            self.page_range[col][17] = tail_page
-            self.bufferpool.unpin_page(tail_page.path, tail_page.page_num)
+            pages = self.bufferpool.get_pages(self.path, list(range(1, 18)), col)
+            for page in pages: self.page_range[col][page.page_num] = page
+            self.bufferpool.unpin_many([page.page_id for page in pages])
 
-    def write(self, columns: list):
+    def _own_dir(self, col: int) -> dict:
         """
-        Write a new record to the table
+        Gets a column's page directory for writing, copying it first if a version snapshot shares it.
+        Must be called with the column's directory lock held, so two writers cannot both copy the column and drop each other's entries.
         """
-        rid = columns[self.key_col]
-        if rid in self.page_directory[self.key_col]:
-            return None
-            
-        # Prepare metadata
-        metadata = [
-            0,              # INDIRECTION_COLUMN (no updates yet)
-            rid,            # RID_COLUMN
-            int(time()),    # TIMESTAMP_COLUMN
-            0              # SCHEMA_ENCODING_COLUMN (no updates yet)
-        ]
-        
-        # Write metadata columns first
-        for i in range(self.metadata_columns):
 
-            # Initialize variables
-            page, index, page_num = None, None, None
-            
-            # Find page with capacity
-            for k, v in self.page_range[i].items():
+        # Copy the column on its first write after a snapshot
+        if self._pd_shared[col]: self.page_directory[col] = dict(self.page_directory[col]); self._pd_shared[col] = False
 
-                # Get the page
-                curr_page = self._get_page(i, k)
+        # Return the column's page directory
+        return self.page_directory[col]
 
-                # If the page has capacity, set the page number, index, and page
-                if curr_page.has_capacity(): page_num, index, page = k, curr_page.num_records(), curr_page; break
+    @contextmanager
+    def _all_dirs_locked(self):
+        """
+        Holds every column's directory lock, in column order, for the duration of a with block
+        """
+
+        # Take the locks in column order, so two callers cannot deadlock
+        for lock in self._dir_locks: lock.acquire()
+
+        # Run the block, then release the locks
+        try: yield
+        finally:
+            for lock in self._dir_locks: lock.release()
+
+    def _get_page_with_capacity(self, col: int) -> tuple[int, Page]:
+        """
+        Gets a pinned page with capacity for a column, creating a new page if needed
+        """
+
+        # Use the column's open page; pages before it are full
+        col_pages, page_num = self.page_range[col], self._open_pages[col]
+        if page_num in col_pages:
+
+            # Get the page
+            page = self._get_page(col, page_num)
+
+            # If the page has capacity, return it
+            if page.n < page.max_records: return page_num, page
 
-                # Unpin the page
-                self.bufferpool.unpin_page(curr_page.path, curr_page.page_num)
-                    
-            # Create new page if needed
-            if page_num is None or index is None or page is None:
-                index = 0
-                self.last_page_number += 1
-                page_num = self.last_page_number
-                page = self._get_page(i, page_num)
-                self.page_range[i][page_num] = page
-            
-            # Write metadata
-            if page.write(metadata[i]):
-                self.bufferpool.mark_dirty(page.path, page.page_num)
-                self.page_directory[i][rid] = [page_num, index]
-            
             # Unpin the page
-            self.bufferpool.unpin_page(page.path, page.page_num)
-            
-        # Write actual data columns
-        for i in range(self.num_columns):
+            self.bufferpool.unpin_by_id(page.page_id)
 
-            # Initialize variables
-            page, index, page_num = None, None, None
-            
-            # Find page with capacity
-            for k, v in self.page_range[i + self.metadata_columns].items(): 
+        # Unless the full open page is the column's newest page, find the first page with capacity
+        if page_num not in col_pages or page_num != next(reversed(col_pages)):
+            for k, cached in col_pages.items():
+
+                # Skip pages the cached page object already shows as full; pages never shrink, so a stale copy cannot hide free space
+                if cached is not None and cached.n >= cached.max_records: continue
 
                 # Get the page
-                curr_page = self._get_page(i + self.metadata_columns, k)
+                page = self._get_page(col, k)
 
-                # If the page has capacity, set the page number, index, and page
-                if curr_page.has_capacity(): page_num, index, page = k, curr_page.num_records(), curr_page; break
+                # If the page has capacity, make it the open page and return it
+                if page.n < page.max_records: self._open_pages[col] = k; return k, page
 
                 # Unpin the page
-                self.bufferpool.unpin_page(curr_page.path, curr_page.page_num)
-                    
-            # Create new page if needed
-            if page_num is None or index is None or page is None:
-                index = 0
-                self.last_page_number += 1
-                page_num = self.last_page_number
-                page = self._get_page(i + self.metadata_columns, page_num)
-                self.page_range[i + self.metadata_columns][page_num] = page
-            
-            # Write data and update indices
-            if page.write(columns[i]):
-                self.bufferpool.mark_dirty(page.path, page.page_num)
-                self.index.add_or_move_record_by_col(i + self.metadata_columns, rid, columns[i])
-                self.page_directory[i + self.metadata_columns][rid] = [page_num, index]
+                self.bufferpool.unpin_by_id(page.page_id)
+
+        # Create new page and make it the open page
+        self.last_page_number += 1
+        page_num = self.last_page_number
+        page = self._get_page(col, page_num)
+        col_pages[page_num] = page; self._open_pages[col] = page_num
+
+        # Return the page number and page
+        return page_num, page
+
+    def _place_row(self, rid: int, row: list) -> tuple[list, list]:
+        """
+        Append a full record, metadata columns first, and map it in the page directory. Returns the pinned and written page ids
+        """
+
+        # Pages pinned and written while writing the record
+        pinned, dirty = [], []
+
+        # Bind the lookups used on every column
+        dir_locks, get_page_with_capacity, own_dir = self._dir_locks, self._get_page_with_capacity, self._own_dir
+
+        # Write every column, metadata and data alike
+        for col, value in enumerate(row):
+
+            # Claim a slot and record it in the page directory under the column lock
+            with dir_locks[col]:
+
+                # Find page with capacity, creating one if needed
+                page_num, page = get_page_with_capacity(col); index = page.n
+
+                # Write the value
+                if page.write(value):
+                    dirty.append(page.page_id)
+                    own_dir(col)[rid] = (page_num << OFFSET_BITS) | index
+
+            # Defer the unpin until the whole record is written
+            pinned.append(page.page_id)
+
+        # Return the pinned and written pages
+        return pinned, dirty
+
+    def write(self, columns: list):
+        """
+        Write a new record to the table
+        """
+        rid = columns[self.key_col]
+        if rid in self.page_directory[self.key_col]:
+            return None
             
-            # Unpin the page
-            self.bufferpool.unpin_page(page.path, page.page_num)
+        # Build the full row, metadata first, in one list
+        row = [
+            0,              # INDIRECTION_COLUMN (no updates yet)
+            rid,            # RID_COLUMN
+            next(self._ts_counter),    # TIMESTAMP_COLUMN
+            0,             # SCHEMA_ENCODING_COLUMN (no updates yet)
+            *columns[:self.num_columns]  # Data columns
+        ]
+        
+        # Place the metadata and data columns, keeping the pages pinned until the whole record is written
+        pinned, dirty = self._place_row(rid, row)
+
+        # Mark the written pages dirty and unpin all of them in one batch
+        self.bufferpool.unpin_many(pinned, dirty)
+
+        # Update the indices for the whole row at once
+        self.index.add_or_move_record_row(rid, columns, self.metadata_columns)
 
     def update(self, columns: list):
         """
@@ -233,10 +345,12 @@ class Table:
         """
 
         # Initialize variables
-        rid, updated, schema_encoding, updated_values = columns[self.key_col], False, 0, []
+        rid, schema_encoding = columns[self.key_col], 0
         
-        # Get current indirection value
-        old_indirection = self.read_value(INDIRECTION_COLUMN, rid)
+        # Get current indirection value; the base indirection page stays pinned until it is repointed
+        base_indirection_info = self.page_directory[INDIRECTION_COLUMN][rid]
+        base_indirection_page = self._get_page(INDIRECTION_COLUMN, base_indirection_info >> OFFSET_BITS)
+        old_indirection = base_indirection_page.read(base_indirection_info & OFFSET_MASK)
         
         # Create new tail record for updates
         tail_rid = self.last_page_number + 1
@@ -245,129 +359,42 @@ class Table:
         metadata = [
             old_indirection,  # INDIRECTION_COLUMN (points to previous version)
             tail_rid,        # RID_COLUMN
-            int(time()),     # TIMESTAMP_COLUMN
+            next(self._ts_counter),     # TIMESTAMP_COLUMN
             0               # SCHEMA_ENCODING_COLUMN (will be set based on updates)
         ]
         
-        # Store updated values and track schema encoding
-        updated_values = []
+        # Get the latest values of all columns, following the indirection chain once
+        updated_values = self.read_latest_row(rid)
 
-        # Iterate through the columns
-        for i in range(self.num_columns):
-
-            # Get the latest value for this column by following indirection chain
-            latest_value = self.read_value(i + self.metadata_columns, rid)
-            
-            # If the column is not None
-            if columns[i] is not None:
-
-                # If the latest value is not the same as the new value
-                if latest_value != columns[i]:
-                    updated = True
-                    schema_encoding |= (1 << i)  # Mark column as updated in schema
-                    updated_values.append(columns[i])
-
-                # Otherwise, append the latest value
-                else: updated_values.append(latest_value)
-
-            # Otherwise, append the latest value
-            else: updated_values.append(latest_value)
+        # Overwrite the columns whose value changes, marking them in the schema
+        for i, value in enumerate(columns[:self.num_columns]):
+            if value is not None and value != updated_values[i]: updated_values[i] = value; schema_encoding |= (1 << i)
+        updated = schema_encoding != 0
         
         if updated:
             # Update schema encoding in metadata
             metadata[SCHEMA_ENCODING_COLUMN] = schema_encoding
-            
-            # Write metadata for tail record
-            for i in range(self.metadata_columns):
 
-                # Initialize variables
-                page, index, page_num = None, None, None
-                
-                # Find page with capacity
-                for k, v in self.page_range[i].items():
-
-                    # Get the page
-                    curr_page = self._get_page(i, k)
-
-                    # If the page has capacity, set the page number, index, and page
-                    if curr_page.has_capacity():
-                        
-                        # Set the page number, index, and page
-                        page_num, index, page = k, curr_page.num_records(), curr_page; break
-
-                # Unpin the page
-                self.bufferpool.unpin_page(curr_page.path, curr_page.page_num)
-                        
-                # Create new page if needed
-                if page_num is None or index is None or page is None:
-                    index = 0
-                    self.last_page_number += 1
-                    page_num = self.last_page_number
-                    page = self._get_page(i, page_num)
-                    self.page_range[i][page_num] = page
-                
-                # Write metadata
-                if page.write(metadata[i]):
-                    self.bufferpool.mark_dirty(page.path, page.page_num)
-                    self.page_directory[i][tail_rid] = [page_num, index]  # Use tail_rid instead of rid
-                
-                # Unpin the page
-                self.bufferpool.unpin_page(page.path, page.page_num)
-            
-            # Write updated values
-            for i in range(self.num_columns):
-
-                # Initialize variables
-                page, index, page_num = None, None, None
-                
-                # Find page with capacity
-                for k, v in self.page_range[i + self.metadata_columns].items():
-
-                    # Get the page
-                    curr_page = self._get_page(i + self.metadata_columns, k)
-
-                    # If the page has capacity, set the page number, index, and page
-                    if curr_page.has_capacity(): page_num, index, page = k, curr_page.num_records(), curr_page; break
-
-                # Unpin the page
-                self.bufferpool.unpin_page(curr_page.path, curr_page.page_num)
-                        
-                # Create new page if needed
-                if page_num is None or index is None or page is None:
-                    index = 0
-                    self.last_page_number += 1
-                    page_num = self.last_page_number
-                    page = self._get_page(i + self.metadata_columns, page_num)
-                    self.page_range[i + self.metadata_columns][page_num] = page
-                
-                # Write value and update indices
-                if page.write(updated_values[i]):
-                    self.bufferpool.mark_dirty(page.path, page.page_num)
-                    # Update index with tail_rid instead of base rid
-                    self.index.add_or_move_record_by_col(i + self.metadata_columns, tail_rid, updated_values[i])
-                    self.page_directory[i + self.metadata_columns][tail_rid] = [page_num, index]  # Use tail_rid instead of rid
-                
-                # Unpin the page
-                self.bufferpool.unpin_page(page.path, page.page_num)
+            # Append the values to the metadata in place and place the tail record, keeping the pages pinned until the whole record is written
+            metadata.extend(updated_values)
+            pinned, dirty = self._place_row(tail_rid, metadata)
             
-            # Update indirection pointer of base record
-            base_indirection_info = self.page_directory[INDIRECTION_COLUMN][rid]
-            base_indirection_page = self._get_page(INDIRECTION_COLUMN, base_indirection_info[0])
-            base_indirection_page.update(base_indirection_info[1], tail_rid)  # Use update instead of write
-
-            # Mark the page as dirty
-            self.bufferpool.mark_dirty(base_indirection_page.path, base_indirection_page.page_num)
+            # Update indirection pointer of base record, reusing the pinned page
+            base_indirection_page.update(base_indirection_info & OFFSET_MASK, tail_rid)  # Use update instead of write
 
-            # Unpin the page
-            self.bufferpool.unpin_page(base_indirection_page.path, base_indirection_page.page_num)
+            # Mark the tail record pages and the indirection page dirty and unpin them in one batch
+            pinned.append(base_indirection_page.page_id); dirty.append(base_indirection_page.page_id)
+            self.bufferpool.unpin_many(pinned, dirty)
             
-            # Update indices for all columns to point to the latest values
-            for i in range(self.num_columns):
-                self.index.add_or_move_record_by_col(i + self.metadata_columns, rid, updated_values[i])
+            # Point the base record's index entries at the latest values; reads resolve through the base RID, so the tail record is not indexed
+            self.index.add_or_move_record_row(rid, updated_values, self.metadata_columns)
             
-            # Increment update count and merge if needed
-            self.update_count += 1
-            if self.update_count >= MERGE_TRIGGER_COUNT: self.merge(); self.update_count = 0
+            # Increment update count and merge if needed; merge resets the count
+            update_num = self._last_update = next(self._update_counter)
+            if update_num - self._merge_base >= MERGE_TRIGGER_COUNT: self.merge()
+
+        # Nothing changed, so release the base indirection page
+        else: self.bufferpool.unpin_by_id(base_indirection_page.page_id)
 
     def read_records(self, col_num: int, search_key: int, proj_col: list) -> list[Record]:
         """
@@ -390,40 +417,49 @@ class Table:
             
             # Otherwise, iterate through the page directory
             else:
-                for k, v in self.page_directory[actual_col].items():
 
-                    # Get the page
-                    page = self._get_page(actual_col, v[0])
+                # Find the pages the column's records live on, in directory order, so each page is pinned once
+                col_dir, matched = self.page_directory[actual_col], set()
+                page_nums = list({v >> OFFSET_BITS: None for v in col_dir.values()})
+
+                # Get the pages as part of a scan in batches, reading the missing ones from disk together
+                for start in range(0, len(page_nums), SCAN_BATCH_PAGES):
+                    batch = page_nums[start:start + SCAN_BATCH_PAGES]
+                    pages = self.bufferpool.get_pages(self.path, batch, actual_col, True)
+
+                    # Search each page's buffer for the key, collecting the packed location of every hit
+                    for page_num, page in zip(batch, pages):
+                        data, location = page.data, page_num << OFFSET_BITS
+                        try: slot = data.index(search_key)
+                        except ValueError: continue
+                        while True:
+                            matched.add(location | slot)
+                            try: slot = data.index(search_key, slot + 1)
+                            except ValueError: break
+
+                    # Unpin the batch
+                    self.bufferpool.unpin_many([page.page_id for page in pages])
 
-                    # Read the value
-                    value = page.read(v[1])
+                # Map the hits back to RIDs, keeping directory order
+                rids = [k for k, v in col_dir.items() if v in matched]
 
-                    # Unpin the page
-                    self.bufferpool.unpin_page(page.path, page.page_num)
-                    
-                    # If the value is the search key, add the RID to the list of RIDs
-                    if value == search_key: rids.append(k)
+        # Bind the lookups used on every record, including the key column directory
+        key_dir, read_value, key_col = self.page_directory[self.metadata_columns + self.key_col], self.read_value, self.key_col
+
+        # Work out the table column of each projected column once; None marks a column left out of the projection
+        proj_cols = [cnt + self.metadata_columns if proj_col[cnt] == 1 else None for cnt in range(self.num_columns)]
 
         # Iterate through the RIDs
         for rid in rids:
 
             # If the RID is in the page directory
-            if rid in self.page_directory[self.metadata_columns + self.key_col]:  # Check in data columns
+            if rid in key_dir:  # Check in data columns
                 
-                # Initialize the columns
-                col = []
-
-                # Iterate through the columns
-                for cnt in range(self.num_columns):
-
-                    # If the column is in the projection list, read the value
-                    if proj_col[cnt] == 1: col.append(self.read_value(cnt + self.metadata_columns, rid))
-
-                    # Otherwise, append None
-                    else: col.append(None)
+                # Read the projected columns, leaving the others as None
+                col = [None if c is None else read_value(c, rid) for c in proj_cols]
 
                 # Append the record
-                records.append(Record(rid, col[self.key_col], col))
+                records.append(Record(rid, col[key_col], col))
 
         # Return the list of records
         return records
@@ -434,63 +470,130 @@ class Table:
         """
 
         # If the RID is not in the page directory, return None
-        if rid not in self.page_directory[col]: return None
+        col_dir = self.page_directory[col]
+        page_details = col_dir.get(rid)
+        if page_details is None: return None
             
         # Only use index for data columns, not metadata
-        if col >= self.metadata_columns and not self.is_history and col < len(self.index.indices) and self.index.indices[col] is not None:
+        indices = self.index.indices
+        if col >= self.metadata_columns and not self.is_history and col < len(indices) and indices[col] is not None:
             return self.index.get_value_in_col_by_rid(col, rid)
             
-        # Get the initial page details
-        page_details, current_rid = self.page_directory[col][rid], rid
-        
-        # If this is a data column and we're not in history mode, follow indirection chain
-        if col >= self.metadata_columns and not self.is_history:
-
-            # Keep track of visited RIDs to prevent infinite loops
-            visited_rids = set([current_rid])
-            
-            # Follow indirection chain until we reach the latest version
-            while True:
-
-                # Check if current_rid exists in indirection column
-                if current_rid not in self.page_directory[INDIRECTION_COLUMN]: break
-                    
-                # Get indirection value
-                ind_details = self.page_directory[INDIRECTION_COLUMN][current_rid]
-                ind_page = self._get_page(INDIRECTION_COLUMN, ind_details[0])
-                if ind_page is None: break
-                    
-                # Get the next RID
-                next_rid = ind_page.read(ind_details[1])
-
-                # Unpin the page
-                self.bufferpool.unpin_page(self.path, ind_page.page_num, INDIRECTION_COLUMN)
-                
-                # If no more updates (indirection is 0) or we've seen this RID before, break
-                if next_rid == 0 or next_rid in visited_rids: break
-                    
-                # Check if next_rid exists in the target column
-                if next_rid not in self.page_directory[col]: break
-                    
-                # Update current RID and page details
-                current_rid = next_rid
-                visited_rids.add(current_rid)
-                page_details = self.page_directory[col][current_rid]
+        # If this is a data column and we're not in history mode, follow indirection chain; otherwise read the record itself
+        if col >= self.metadata_columns and not self.is_history: page_details = self._walk_chain(col_dir, rid)
         
         # Read the value from the final page
-        page = self._get_page(col, page_details[0])
+        page = self._get_page(col, page_details >> OFFSET_BITS)
         if page is None: return None
         
         # Read the value
-        value = page.read(page_details[1])
+        value = page.read(page_details & OFFSET_MASK)
 
         # Unpin the page
-        self.bufferpool.unpin_page(self.path, page.page_num, col)
+        self.bufferpool.unpin_by_id(page.page_id)
 
         # Return the value
         return value
 
 
+    def _chain_rids(self, rid: int) -> list:
+        """
+        Follow the indirection chain from a record and return the RIDs of its newer versions, oldest first.
+        The chain is cached per record with the indirection entries of its RIDs, and reused while the record still points at the same head
+        and none of those RIDs has been rewritten; update reuses a tail RID until its page fills, but every rewrite lands on a new slot
+        """
+
+        # Bind the lookups used on every hop
+        ind_dir, get_page, unpin = self.page_directory[INDIRECTION_COLUMN], self._get_page, self.bufferpool.unpin_by_id
+
+        # Start at the record itself; chains only grow by appending, so a hop cap is enough to stop a corrupted chain that loops
+        chain, current_rid = [], rid
+
+        # Follow indirection chain until we reach the latest version
+        while True:
+
+            # Get the indirection page, stopping if the record has none
+            ind_details = ind_dir.get(current_rid)
+            if ind_details is None: break
+            ind_page = get_page(INDIRECTION_COLUMN, ind_details >> OFFSET_BITS)
+            if ind_page is None: break
+
+            # Get the next RID and unpin the page
+            next_rid = ind_page.read(ind_details & OFFSET_MASK); unpin(ind_page.page_id)
+
+            # If no more updates (indirection is 0), the record points at itself, or the chain is too long, break
+            if next_rid == 0 or next_rid == current_rid or len(chain) >= MAX_CHAIN_HOPS: break
+
+            # If the record still points at the head of its cached chain and no RID on it was rewritten, the chain is unchanged
+            if current_rid == rid and not self.is_history:
+                cached = self._chain_cache.get(rid)
+                if cached is not None and cached[0][0] == next_rid and list(map(ind_dir.get, cached[0])) == cached[1]: return cached[0]
+
+            # Add the RID to the chain
+            chain.append(next_rid); current_rid = next_rid
+
+        # Cache the live chain with where each of its RIDs' indirection entries sits
+        if chain and not self.is_history: self._chain_cache[rid] = (chain, list(map(ind_dir.get, chain)))
+
+        # Return the chain
+        return chain
+
+    def _walk_chain(self, col_dir: dict, rid: int, chain: list = None) -> int:
+        """
+        Return the column's page directory entry for the latest version of a record along its indirection chain
+        """
+
+        # Start at the record itself
+        page_details = col_dir[rid]
+
+        # Follow the chain until a version is missing from the column
+        for next_rid in (self._chain_rids(rid) if chain is None else chain):
+            next_details = col_dir.get(next_rid)
+            if next_details is None: break
+            page_details = next_details
+
+        # Return the latest page details
+        return page_details
+
+    def read_latest_row(self, rid: int) -> list:
+        """
+        Read the latest value of every data column of a record, walking the indirection chain at most once
+        """
+
+        # Initialize variables
+        values, chain = [], None
+
+        # Bind the lookups used on every column
+        page_directory, indices, is_history, get_page, unpin = self.page_directory, self.index.indices, self.is_history, self._get_page, self.bufferpool.unpin_by_id
+
+        # Iterate through the data columns
+        for col in range(self.metadata_columns, self.total_columns):
+
+            # If the RID is not in the column, there is no value
+            col_dir = page_directory[col]
+            page_details = col_dir.get(rid)
+            if page_details is None: values.append(None); continue
+
+            # Use the index when the column has one, as read_value does
+            if not is_history and col < len(indices) and indices[col] is not None:
+                values.append(self.index.get_value_in_col_by_rid(col, rid)); continue
+
+            # Outside history mode, follow the chain, walking it only for the first column that needs it; in history mode, read the record itself
+            if not is_history:
+                if chain is None: chain = self._chain_rids(rid)
+                page_details = self._walk_chain(col_dir, rid, chain)
+
+            # Read the value from the final page
+            page = get_page(col, page_details >> OFFSET_BITS)
+            if page is None: values.append(None); continue
+            values.append(page.read(page_details & OFFSET_MASK))
+
+            # Unpin the page
+            unpin(page.page_id)
+
+        # Return the values
+        return values
+
     def read_page(self, page_num: int, index: int, col: int = None) -> int:
         """
         Read value from specific page
@@ -503,7 +606,7 @@ class Table:
             page = self._get_page(col, page_num); value = page.read(index)
 
             # Unpin the page
-            self.bufferpool.unpin_page(page.path, page.page_num)
+            self.bufferpool.unpin_by_id(page.page_id)
 
             # Return the value
             return value
@@ -515,7 +618,7 @@ class Table:
             page = self._get_page(i, page_num); value = page.read(index)
 
             # Unpin the page
-            self.bufferpool.unpin_page(page.path, page.page_num)
+            self.bufferpool.unpin_by_id(page.page_id)
 
             # If the value is not None, return the value
             if value is not None: return value
@@ -531,113 +634,83 @@ class Table:
         # Iterate through the columns
         for i in range(self.num_columns):
 
-            # Pop the RID from the page directory
-            self.page_directory[i].pop(rid)
+            # Pop the RID from the page directory under the column lock
+            with self._dir_locks[i]: self._own_dir(i).pop(rid)
 
             # Delete the record from the index
             self.index.delete_record(i, rid)
 
+        # Drop the record's cached chain
+        self._chain_cache.pop(rid, None)
+
     def make_ver_copy(self):
         """
         Create version snapshot with thread safety
         """
 
-        # Enable the version lock
-        with self.version_lock:
+        # Take the version lock for writing, and the column locks so no write lands in a directory after it is shared
+        with self.version_lock.write(), self._all_dirs_locked():
 
-            # Create deep copy of page directory to avoid concurrent modifications
-            version_snapshot = [{k:[v[0], v[1]] for k,v in col.items()} for col in self.page_directory]
+            # Share the column directories with the snapshot; each is copied on its next write
+            version_snapshot = list(self.page_directory)
+            self._pd_shared = [True] * self.total_columns
 
-            # Append the version snapshot
-            self.versions.append(version_snapshot)
-            self.version_timestamps.append(time())  # Track version creation time using imported time function
-            
-            # Keep only last 10 versions to prevent memory bloat
-            if len(self.versions) > 10: self.versions.pop(0); self.version_timestamps.pop(0)
+            # Build the new version lists instead of changing the published ones, keeping only the last 10 versions to prevent memory bloat
+            versions = (self.versions + [version_snapshot])[-10:]
+            timestamps = (self.version_timestamps + [time()])[-10:]  # Track version creation time using imported time function
+
+            # Swap in the new lists, publishing them to readers as one pair so they never see them out of step
+            self.versions, self.version_timestamps = versions, timestamps
+            self._version_view = (versions, timestamps)
 
             # Return the version number
-            return len(self.versions) - 1
+            return len(versions) - 1
 
 
     def get_version_at_time(self, timestamp):
         """
-        Get the version that was active at the given timestamp
+        Get the version that was active at the given timestamp. Lock-free; reads the published version lists.
         """
 
-        # Enable the version lock
-        with self.version_lock:
-
-            # If the version timestamps are empty, return None
-            if not self.version_timestamps: return None
+        # Take the published versions and timestamps together
+        versions, timestamps = self._version_view
 
-            # Iterate through the version timestamps
-            for i in range(len(self.version_timestamps) - 1, -1, -1):
+        # If the version timestamps are empty, return None
+        if not timestamps: return None
 
-                # If the version timestamp is less than or equal to the timestamp, return the version
-                if self.version_timestamps[i] <= timestamp: return self.versions[i]
-            
-            # Return the first version
-            return self.versions[0] if self.versions else None
+        # Timestamps are appended in time order, so binary search for the last one at or before the timestamp
+        i = bisect_right(timestamps, timestamp) - 1
+        if i >= 0: return versions[i]
+        
+        # Return the first version
+        return versions[0] if versions else None
 
 
     def restore_version(self, version_number):
         """
-        Restore table state to a specific version
+        Restore table state to a specific version. Lock-free; reads the published version lists.
         """
 
-        # Enable the version lock
-        with self.version_lock:
+        # Take the published versions
+        versions = self._version_view[0]
 
-            # If the version number is valid, return the version, otherwise return None
-            return self.versions[version_number] if 0 <= version_number < len(self.versions) else None
+        # If the version number is valid, return the version, otherwise return None
+        return versions[version_number] if 0 <= version_number < len(versions) else None
 
     def save(self):
         """
         Save table metadata and ensure all pages are flushed to disk
         """
 
-        # Iterate through the columns
-        for col in range(self.total_columns):
+        # Collect the dirty pages of every column
+        dirty = [page for col in self.page_range for page in col.values() if page is not None and page.is_dirty]
 
-            # Iterate through the page range
-            for page_num in self.page_range[col].keys():
+        # Flush them to disk in one batch
+        if dirty: self.bufferpool.flush_batch(dirty)
 
-                # Get the page
-                page = self.page_range[col][page_num]
-
-                # If the page is dirty, flush it to disk
-                if page.is_dirty:
-                    page.flush_to_disk()
-                    self.bufferpool.unpin_page(self.path, page_num, col)
-
-        # Save the page directory
-        with open(os.path.join(self.path, 'page_directory.json'), "w") as file:
-
-            # Convert all keys and values to strings for JSON serialization
-            page_dir_json = [{str(k): [v[0], v[1]] for k, v in col.items()} for col in self.page_directory]
-
-            # Write the page directory to the file
-            file.write(json.dumps(page_dir_json))
-
-        # Save the page range
-        value = []
-
-        # Iterate through the page range and append the page numbers
-        for col in self.page_range: value.append([str(k) for k in col.keys()])
-
-        # Write the page range to the file
-        with open(os.path.join(self.path, 'page_range.json'), "w") as file: file.write(json.dumps(value))
-
-        # Save the versions
-        with open(os.path.join(self.path, 'versions.json'), "w") as file:
-
-            # Convert all keys to strings for JSON serialization
-            versions_json = [[{str(k): [v[0], v[1]] 
-                             for k, v in col.items()} for col in version] 
-                           for version in self.versions]
-            
-            # Write the versions to the file    
-            file.write(json.dumps(versions_json))
+        # Save the page directory, page numbers, and versions; pickle keeps the integer keys and entries as they are
+        for name, value in (('page_directory', self.page_directory), ('page_range', [list(col.keys()) for col in self.page_range]), ('versions', self.versions)):
+            with open(os.path.join(self.path, f'{name}.pickle'), 'wb') as file: pickle.dump(value, file, protocol=5)
 
         # Save the metadata
         data = {
@@ -649,6 +722,19 @@ class Table:
         # Write the metadata to the file
         with open(os.path.join(self.path, 'metadata.json'), "w") as file: file.write(json.dumps(data))
 
+    def _load_saved(self, name: str, from_json):
+        """
+        Load a structure written by save, converting the JSON file written by older versions if there is no pickle
+        """
+
+        # Load the pickle if it exists
+        path = os.path.join(self.path, name)
+        if os.path.exists(f'{path}.pickle'):
+            with open(f'{path}.pickle', 'rb') as file: return pickle.load(file)
+
+        # Otherwise, convert the JSON file
+        with open(f'{path}.json') as file: return from_json(json.load(file))
+
     def restart_table(self):
         """
         Restart table from disk
@@ -658,7 +744,7 @@ class Table:
         self.last_page_number = 0
         
         # Load metadata
-        data = json.load(open(os.path.join(self.path, 'metadata.json')))
+        with open(os.path.join(self.path, 'metadata.json')) as file: data = json.load(file)
         self.num_columns = int(data["columns"])
         self.key_col = int(data["key_col"])
         self.update_count = int(data.get("update_count", 0))  # Default to 0 if not found
@@ -669,43 +755,32 @@ class Table:
         # Reinitialize page ranges for both data and metadata columns
         self.page_directory, self.page_range = [], []
         for i in range(self.total_columns): self.page_range.append(dict()); self.page_directory.append(dict())
+        self._open_pages = [None] * self.total_columns
         
         # Load page directory
-        page_dir = json.load(open(os.path.join(self.path, 'page_directory.json')))
-        self.page_directory = [{int(k):[int(v[0]), int(v[1])] for k,v in col.items()} for col in page_dir]
+        self.page_directory = _pack_directory(self._load_saved('page_directory', lambda page_dir: [{int(k):(int(v[0]), int(v[1])) for k,v in col.items()} for col in page_dir]))
+        self._pd_shared = [False] * self.total_columns
         
-        # Load page range and initialize pages
-        page_ranges_data = json.load(open(os.path.join(self.path, 'page_range.json')))
+        # Load page range
+        page_ranges_data = self._load_saved('page_range', lambda page_ranges: page_ranges)
 
         # Iterate through the page ranges
         for i, page_range_nums in enumerate(page_ranges_data):
 
-            # Iterate through the page numbers
-            for page_num in page_range_nums:
-
-                # Ensure the page number is an integer
-                page_num = int(page_num)
-
-                # Create and load the page
-                page = self._get_page(i, page_num)
+            # Ensure the page numbers are integers
+            page_nums = [int(page_num) for page_num in page_range_nums]
 
-                # If the page is not None, add it to the page range
-                if page is not None:
+            # Register the pages without reading them; None marks a page the bufferpool loads on first access
+            self.page_range[i] = dict.fromkeys(page_nums)
 
-                    # Add the page to the page range
-                    self.page_range[i][page_num] = page
-
-                    # Unpin after loading
-                    self.bufferpool.unpin_page(self.path, page_num, i)
-
-                    # Update the last page number
-                    if page_num > self.last_page_number: self.last_page_number = page_num
+            # Update the last page number
+            if page_nums: self.last_page_number = max(self.last_page_number, max(page_nums))
         
         # Load versions
-        versions = json.load(open(os.path.join(self.path, 'versions.json')))
-        self.versions = [[{int(k):[int(v[0]), int(v[1])] 
-                          for k,v in col.items()} for col in version] 
-                        for version in versions]
+        self.versions = [_pack_directory(version) for version in self._load_saved('versions', lambda versions: [[{int(k):(int(v[0]), int(v[1])) 
+                                                                          for k,v in col.items()} for col in version] 
+                                                                        for version in versions])]
+        self._version_view = (self.versions, self.version_timestamps)
         
         # Rebuild indices
         self.index = Index(self)
@@ -720,43 +795,26 @@ class Table:
         Merge base and tail records
         """
 
-        # Create reverse mapping for quick RID lookup
-        tail_to_rid = {}
-
-        # Iterate through the columns
-        for i in range(self.total_columns):
-
-            # Initialize the tail to RID dictionary
-            tail_to_rid[i] = {}
-
-            # Iterate through the page directory
-            for rid, location in self.page_directory[i].items():
-
-                # Get the page number
-                page_num = location[0]
-
-                # If the page number is greater than 16, it's a tail page
-                if page_num > 16:
-
-                    # If the page number is not in the tail to RID dictionary, add it
-                    if page_num not in tail_to_rid[i]: tail_to_rid[i][page_num] = {}
+        # Group each column's tail records by page as {page_num: {index: rid}} in a single pass over the directory
+        tail_to_rid, tail_start, dir_locks = [], 17 << OFFSET_BITS, self._dir_locks  # Smallest packed location on a tail page
+        for col in range(self.total_columns):
 
-                    # Add the RID to the tail to RID dictionary
-                    tail_to_rid[i][page_num][location[1]] = rid
+            # If the page number is greater than 16, it's a tail page; packed locations order by page, so compare without decoding
+            col_tails = {}
+            with dir_locks[col]:
+                for rid, location in self.page_directory[col].items():
+                    if location >= tail_start: col_tails.setdefault(location >> OFFSET_BITS, {})[location & OFFSET_MASK] = rid
+            tail_to_rid.append(col_tails)
 
         # Track which records have been updated
-        updated_records = {}  # rid -> {col -> value}
+        updated_records = defaultdict(dict)  # rid -> {col -> value}
         
         # Process tail pages in reverse order (newest to oldest)
         for i in range(self.total_columns):
-            pages = list(self.page_range[i].keys())
-            tail_pages = [p for p in pages if p > 16]  # Only tail pages
-            
-            # If there are no tail pages, continue
-            if not tail_pages: continue
-                
-            # Process each tail page
-            for tail_page_num in reversed(tail_pages):
+
+            # Only the tail pages holding directory entries need to be read
+            col_tails = tail_to_rid[i]
+            for tail_page_num in reversed([p for p in self.page_range[i] if p in col_tails]):
 
                 # Get the tail page
                 tail_page = self._get_page(i, tail_page_num)
@@ -764,25 +822,23 @@ class Table:
                 # If the tail page is None, move to the next tail page
                 if tail_page is None: continue
                 
-                # Process all records in the tail page
-                for idx in range(tail_page.num_records()):
-
-                    # If the tail page number is in the tail to RID dictionary and the index is in the tail to RID dictionary, get the RID
-                    if tail_page_num in tail_to_rid[i] and idx in tail_to_rid[i][tail_page_num]:
+                # Read just the slots the directory points at, straight from the page buffer
+                data, slots = tail_page.data, col_tails[tail_page_num]
+                for idx in sorted(slots):
+                    if idx >= len(data): break
 
-                        # Get the RID
-                        rid = tail_to_rid[i][tail_page_num][idx]
-
-                        # Get the value
-                        value = tail_page.read(idx)
-                        
-                        # Only store the first (most recent) value for each column
-                        if rid not in updated_records: updated_records[rid] = {}
-                        if i not in updated_records[rid]: updated_records[rid][i] = value
+                    # Each RID has one entry per column, so this is its most recent value
+                    updated_records[slots[idx]][i] = data[idx]
                 
                 # Unpin the tail page
-                self.bufferpool.unpin_page(tail_page.path, tail_page.page_num)
+                self.bufferpool.unpin_by_id(tail_page.page_id)
         
+        # Base pages pinned for the whole merge, by (column, page number)
+        base_pages = {}
+
+        # Bind the lookups used on every record
+        get_page, own_dir, mark_dirty, meta_cols = self._get_page, self._own_dir, self.bufferpool.mark_dirty_by_id, self.metadata_columns
+
         # Batch update base pages with consolidated records
         for rid, col_values in updated_records.items():
 
@@ -792,282 +848,70 @@ class Table:
             # Update each column's base page
             for col, value in col_values.items():
 
-                # Get the base page
-                base_page = self._get_page(col, base_page_num)
+                # Get the base page, pinning it once for the whole merge
+                base_page = base_pages.get((col, base_page_num))
+                if base_page is None: base_page = base_pages[(col, base_page_num)] = get_page(col, base_page_num)
 
                 # If the base page is None, move to the next base page
                 if base_page is None: continue
 
-                # If the base page has capacity, write the value
-                if base_page.has_capacity():
+                # If the base page has capacity, claim a slot and write the value under the column lock
+                with dir_locks[col]:
+                    if base_page.has_capacity():
 
-                    # Get the index
-                    index = base_page.num_records()
+                        # Get the index
+                        index = base_page.num_records()
 
-                    # Write the value
-                    if base_page.write(value):
+                        # Write the value
+                        if base_page.write(value):
 
-                        # Mark the base page as dirty
-                        self.bufferpool.mark_dirty(base_page.path, base_page.page_num)
+                            # Mark the base page as dirty
+                            mark_dirty(base_page.page_id)
 
-                        # Update the page directory
-                        self.page_directory[col][rid] = [base_page_num, index]
-                        
-                        # Update index if this is a data column
-                        if col >= self.metadata_columns: self.index.add_or_move_record_by_col(col, rid, value)
-                
-                # Unpin the base page
-                self.bufferpool.unpin_page(base_page.path, base_page.page_num)
+                            # Update the page directory
+                            own_dir(col)[rid] = (base_page_num << OFFSET_BITS) | index
+                            
+                            # Update index if this is a data column
+                            if col >= meta_cols: self.index.add_or_move_record_by_col(col, rid, value)
             
             # Reset metadata for the consolidated record
-            if self.metadata_columns in col_values:
+            if meta_cols in col_values:
                 
                 # Reset indirection to 0 (no more updates)
-                indirection_page = self._get_page(INDIRECTION_COLUMN, base_page_num)
+                indirection_page = base_pages.get((INDIRECTION_COLUMN, base_page_num))
+                if indirection_page is None: indirection_page = base_pages[(INDIRECTION_COLUMN, base_page_num)] = get_page(INDIRECTION_COLUMN, base_page_num)
 
-                # If the indirection page is not None and has capacity, write the value
-                if indirection_page and indirection_page.has_capacity():
+                # If the indirection page is not None and has capacity, write the value under the column lock
+                with dir_locks[INDIRECTION_COLUMN]:
+                    if indirection_page and indirection_page.has_capacity():
 
-                    # Get the index
-                    index = indirection_page.num_records()
+                        # Get the index
+                        index = indirection_page.num_records()
 
-                    # Write the value
-                    indirection_page.write(0)
+                        # Write the value
+                        indirection_page.write(0)
 
-                    # Update the page directory
-                    self.page_directory[INDIRECTION_COLUMN][rid] = [base_page_num, index]
+                        # Update the page directory
+                        own_dir(INDIRECTION_COLUMN)[rid] = (base_page_num << OFFSET_BITS) | index
 
-                    # Mark the indirection page as dirty
-                    self.bufferpool.mark_dirty(indirection_page.path, indirection_page.page_num)
+                        # Mark the indirection page as dirty
+                        mark_dirty(indirection_page.page_id)
 
-                    # Unpin the indirection page
-                    self.bufferpool.unpin_page(indirection_page.path, indirection_page.page_num)
+        # Unpin the base pages in one batch
+        self.bufferpool.unpin_many([page.page_id for page in base_pages.values() if page is not None])
         
-        # Clear tail pages after successful merge
+        # Clear tail pages after successful merge, rebuilding each column's pages without them in one pass,
+        # and reset the open page hints; page numbers keep counting up so new tail pages never reuse a retired page's file
         for i in range(self.total_columns):
+            with dir_locks[i]: self.page_range[i] = {k: v for k, v in self.page_range[i].items() if k <= 16}; self._open_pages[i] = None
 
-            # Get the pages
-            pages = list(self.page_range[i].keys())
-
-            # Get the tail pages
-            tail_pages = [p for p in pages if p > 16]
-
-            # Iterate through the tail pages
-            for tail_page_num in tail_pages: self.page_range[i].pop(tail_page_num)
-        
-        # Reset last page number
-        self.last_page_number = self.total_columns * 16 + self.total_columns
+        # Merged records have new base metadata, so drop the cached chains
+        self._chain_cache.clear()
         
         # Reset update count
         self.update_count = 0
 
 
-    def get_page_range_for_rid(self, rid: int) -> int:
-        """
-        Determines which page range a RID belongs to
-        """
-        return rid // (self.base_pages_per_range * 512)  # 512 records per page
-
-
-    def create_new_page_range(self):
-        """
-        Creates a new page range
-        """
-
-        # Create a new page range
-        page_range = {
-            'base_pages': {},
-            'tail_pages': {},
-            'base_rid_count': 0
-        }
-
-        # Add the page range to the page ranges
-        self.page_ranges.append(page_range)
-
-        # Set the current page range
-        self.current_page_range = len(self.page_ranges) - 1
-
-        # Return the page range
-        return page_range
-    
-
-    def get_or_create_page_range(self, rid: int) -> dict:
-        """
-        Gets the appropriate page range for a RID, creating it if necessary
-        """
-
-        # Get the page range for the RID
-        range_index = self.get_page_range_for_rid(rid)
-
-        # If the page range is not in the page ranges, create a new page range
-        while range_index >= len(self.page_ranges): self.create_new_page_range()
-
-        # Return the page range
-        return self.page_ranges[range_index]
-    
-
-    def insert_record(self, *columns) -> int:
-        """
-        Insert a record with specified columns
-        """
-
-        # If the number of columns is not equal to the number of columns in the table, raise an error
-        if len(columns) != self.num_columns: 
-            raise ValueError(f"Expected {self.num_columns} columns but got {len(columns)}")
-
-        # Get or create appropriate page range
-        rid = self._get_next_rid(); page_range = self.get_or_create_page_range(rid)
-        
-        # Initialize metadata
-        schema_encoding, timestamp, indirection = '0' * self.num_columns, int(time()), 0
-        
-        # Prepare all values (metadata + data)
-        all_values = [indirection, rid, timestamp, schema_encoding] + list(columns)
-        
-        # Insert into each column
-        for col_index, value in enumerate(all_values):
-            
-            # Get or create page for this column in the current page range
-            page_num = self._get_or_create_page_for_column(col_index, rid, is_base=True)
-            page = self._get_page(col_index, page_num)
-            
-            # Calculate offset within page
-            offset = (rid % 512)  # 512 records per page
-            
-            # Write value to the page
-            page.write(offset, value)
-
-            # Update the page directory
-            self.page_directory[col_index][rid] = (page_num, offset)
-
-            # Unpin the page
-            self.bufferpool.unpin_page(page.path, page.page_num)
-            
-        # Update page range record count
-        page_range['base_rid_count'] += 1
-        
-        # Add to index if it exists
-        if self.index.indices[self.key_col]: self.index.add_to_index(self.key_col, columns[self.key_col], rid)
-            
-        # Return the RID
-        return rid
-
-    def update_record(self, primary_key: int, *columns) -> None:
-        """
-        Update a record with specified columns
-        """
-
-        # If the number of columns is not equal to the number of columns in the table, raise an error
-        if len(columns) != self.num_columns:
-            raise ValueError(f"Expected {self.num_columns} columns but got {len(columns)}")
-            
-        # Find the base RID using index
-        base_rid = self.index.get_rid_from_key(self.key_col, primary_key)
-
-        # If the base RID is None, raise an error
-        if base_rid is None: raise ValueError(f"Record with primary key {primary_key} not found")
-            
-        # Get the page range for this record
-        page_range = self.get_or_create_page_range(base_rid)
-        
-        # Create new tail record
-        new_rid = self._get_next_rid()
-        
-        # Get current schema encoding
-        schema_encoding_details = self.page_directory[SCHEMA_ENCODING_COLUMN][base_rid]
-        schema_page = self._get_page(SCHEMA_ENCODING_COLUMN, schema_encoding_details[0])
-        current_schema = schema_page.read(schema_encoding_details[1])
-        self.bufferpool.unpin_page(schema_page.path, schema_page.page_num)
-        
-        # Update schema encoding based on which columns are being updated
-        new_schema = list(bin(current_schema)[2:].zfill(self.num_columns))
-
-        # Update the schema encoding
-        for i, value in enumerate(columns):
-            if value is not None: new_schema[i] = '1'
-        new_schema = int(''.join(new_schema), 2)
-        
-        # Prepare metadata for tail record
-        timestamp = int(time())
-        
-        # Get current indirection
-        ind_details = self.page_directory[INDIRECTION_COLUMN][base_rid]
-        ind_page = self._get_page(INDIRECTION_COLUMN, ind_details[0])
-        current_indirection = ind_page.read(ind_details[1])
-
-        # Unpin the indirection page
-        self.bufferpool.unpin_page(ind_page.path, ind_page.page_num)
-        
-        # Prepare all values for tail record
-        all_values = [current_indirection, new_rid, timestamp, new_schema]
-        
-        # Iterate through the columns
-        for i in range(self.num_columns):   
-
-            # If the column is not None, add the value to the all values list
-            if columns[i] is not None: all_values.append(columns[i])
-
-            # Otherwise, add the value from the base record to the all values list
-            else: all_values.append(self.read_value(i + self.metadata_columns, base_rid))
-        
-        # Insert tail record
-        for col_index, value in enumerate(all_values):
-
-            # Get or create tail page for this column
-            page_num = self._get_or_create_page_for_column(col_index, new_rid, is_base=False)
-            page = self._get_page(col_index, page_num)
-            
-            # Calculate offset within page
-            offset = (new_rid % 512)
-            
-            # Write value to the page
-            page.write(offset, value)
-
-            # Update the page directory
-            self.page_directory[col_index][new_rid] = (page_num, offset)
-
-            # Unpin the page
-            self.bufferpool.unpin_page(page.path, page.page_num)
-            
-        # Update base record's indirection to point to new tail record
-        ind_page = self._get_page(INDIRECTION_COLUMN, ind_details[0])
-        ind_page.write(ind_details[1], new_rid)
-
-        # Unpin the indirection page
-        self.bufferpool.unpin_page(ind_page.path, ind_page.page_num)
-        
-        # Increment update count
-        self.update_count += 1
-
-
-    def _get_or_create_page_for_column(self, col_index: int, rid: int, is_base: bool = True) -> int:
-        """
-        Gets or creates a page for the specified column in the appropriate page range
-        """
-
-        # Get or create the page range
-        page_range = self.get_or_create_page_range(rid)
-
-        # Get the pages dictionary
-        pages_dict = page_range['base_pages'] if is_base else page_range['tail_pages']
-        
-        # If the column is not in the pages dictionary, create a new list
-        if col_index not in pages_dict: pages_dict[col_index] = []
-            
-        # Calculate which page number within the range we need
-        records_per_page = 512
-        page_index = (rid % (records_per_page * self.base_pages_per_range)) // records_per_page
-        
-        # Create new pages if needed
-        while len(pages_dict[col_index]) <= page_index:
-            new_page_num = len(self.page_range[col_index])
-            new_page = Page(new_page_num, os.path.join(self.path, "data", f"{col_index}_{new_page_num}.page"), col_index)
-            self.page_range[col_index][new_page_num] = new_page
-            pages_dict[col_index].append(new_page_num)
-            
-        # Return the page number
-        return pages_dict[col_index][page_index]
-
     def select_version(self, version_num: int):
         """
         Select a specific version of the table
@@ -1081,15 +925,35 @@ class Table:
             
         # Validate version number
         if version_num < 0 or version_num >= len(self.versions): return False
+
+        # Swap the directories under the column locks, so no write lands in a directory while it is swapped
+        with self._all_dirs_locked():
+
+            # Keep the live page directory and its sharing flags so they can be restored by select_current
+            if not self.is_history: self._live_page_directory = self.page_directory; self._live_pd_shared = self._pd_shared
+
+            # Set history mode
+            self.is_history = True
             
-        # Set history mode
-        self.is_history = True
-        
-        # Restore the selected version's page directory
-        self.page_directory = [
-            {k: list(v) for k, v in version_dict.items()}
-            for version_dict in self.versions[version_num]
-        ]
+            # Point at a copy of the selected version's column list, with every column marked shared so a write copies it instead of changing the snapshot
+            self.page_directory = list(self.versions[version_num])
+            self._pd_shared = [True] * self.total_columns
         
         # Return True
-        return True
\ No newline at end of file
+        return True
+
+    def select_current(self):
+        """
+        Switch back to the live version of the table after select_version
+        """
+
+        # If not in history mode, nothing to restore
+        if not self.is_history: return
+
+        # Restore the live page directory and its sharing flags under the column locks
+        with self._all_dirs_locked():
+            self.page_directory, self._pd_shared = self._live_page_directory, self._live_pd_shared
+            self._live_page_directory = self._live_pd_shared = None
+
+            # Leave history mode
+            self.is_history = False
@@ -1,28 +1,39 @@
+from itertools import count
 from lstore.table import Table, Record
 from lstore.index import Index
-from lstore.lock import LockManager, LockType
+from lstore.lock import ShardedLockManager, LockType
 from lstore.logger import Logger
 from typing import Dict, List, Tuple, Any
+from lstore.config import LOCK_WAIT_TIMEOUT
+
+# Query opcodes, ordered so reads come first: select and sum lock their record, and no read is logged
+_SELECT, _SUM, _SELECT_VERSION, _SUM_VERSION, _INSERT, _UPDATE, _DELETE, _OTHER = range(8)
+_OPCODE = {'select': _SELECT, 'sum': _SUM, 'select_version': _SELECT_VERSION, 'sum_version': _SUM_VERSION, 'insert': _INSERT, 'update': _UPDATE, 'delete': _DELETE}
+
+# Transaction ids, handed out in increasing order and never reused
+_txid_counter = count(1)
 
 class Transaction:
     """
     Handles a single transaction with support for concurrent execution.
     """
-    _lock_manager = LockManager()  # Class-level lock manager shared by all transactions
+    __slots__ = ('queries', 'transaction_id', 'modified_records', '_undo_keys', '_undo_vals', '_log_buf')
+    _lock_manager = ShardedLockManager()  # Class-level lock manager shared by all transactions, sharded by record
     _logger = Logger()  # Class-level logger shared by all transactions
     
     def __init__(self):
         self.queries = []
-        self.transaction_id = id(self)  # Use object id as transaction id
-        self.acquired_locks = set()  # Track acquired locks for rollback
+        self.transaction_id = next(_txid_counter)  # Monotonic transaction id, unlike id(self), which is reused once a transaction is freed
         self.modified_records = []  # Track modifications for rollback
-        self.original_values = {}  # Store original values for rollback: (table_name, rid) -> {col: value}
+        self._undo_keys = []  # Original values for rollback, flat: ((table_name, key), col) per saved value
+        self._undo_vals = []  # The saved values, parallel to _undo_keys; None for a column the record does not hold
+        self._log_buf = []  # Log lines buffered until commit/abort, then written in one go
 
     def add_query(self, query, table, *args):
         """
-        Adds the given query to this transaction
+        Adds the given query to this transaction, with its opcode looked up once here rather than on every run
         """
-        self.queries.append((query, table, args))
+        self.queries.append((query, table, args, _OPCODE.get(query.__name__, _OTHER)))
 
     def _save_original_state(self, table: Table, key: int, cols: List[int]):
         """
@@ -32,8 +43,11 @@ class Transaction:
         # If the columns are empty, return
         if not cols: return
             
-        # Get current record state
-        record = table.read_records(table.key_col, key, [1] * table.num_columns)
+        # Get current record state, reading only the columns being changed
+        num_columns = table.num_columns
+        projection = [0 if col is None else 1 for col in cols[:num_columns]]
+        if len(projection) < num_columns: projection.extend([0] * (num_columns - len(projection)))
+        record = table.read_records(table.key_col, key, projection)
 
         # If the record is empty, return
         if not record: return
@@ -43,16 +57,43 @@ class Transaction:
 
         # Get the state key
         state_key = (table.name, key)
-        
-        # If the state key is not in the original values, create a new dictionary
-        if state_key not in self.original_values: self.original_values[state_key] = {}
-            
+
         # Iterate through the columns
         for i, col in enumerate(cols):
 
             # If the column is not None, save the original value
-            if col is not None: self.original_values[state_key][i] = record.columns[i]
+            if col is not None: self._undo_keys.append((state_key, i)); self._undo_vals.append(record.columns[i])
+
+    def _original_values(self) -> Dict[Tuple[str, Any], Dict[int, int]]:
+        """
+        Groups the saved original values by record in one pass, later saves of a column overriding earlier ones
+        """
+        original_values = {}
+        for (state_key, col), value in zip(self._undo_keys, self._undo_vals): original_values.setdefault(state_key, {})[col] = value
+        return original_values
+
+
+    def _plan_locks(self) -> List[Tuple[Tuple[str, Any], LockType]]:
+        """
+        Collects the lock each record needs across all queries, exclusive if any query writes it, sorted by (table_name, key)
+        """
 
+        # Initialize the plan
+        plan = {}
+
+        # Iterate through the queries
+        for _, table, args, op in self.queries:
+
+            # Only operations on an existing record need a lock
+            if op not in (_SELECT, _SUM, _UPDATE, _DELETE): continue
+
+            # Determine lock type based on operation, keeping an exclusive lock once any query needs one
+            lock_key = (table.name, args[0])
+            if op >= _UPDATE: plan[lock_key] = LockType.EXCLUSIVE
+            else: plan.setdefault(lock_key, LockType.SHARED)
+
+        # Return the locks in a deterministic order
+        return sorted(plan.items(), key=lambda item: item[0])
 
     def run(self):
         """
@@ -61,39 +102,33 @@ class Transaction:
         """
         try:
 
-            # Iterate through the queries
-            for query, table, args in self.queries:
-
-                # Log the operation before execution
-                self._logger.log_transaction(
-                    self.transaction_id,
-                    query.__name__,
-                    table.name,
-                    args[0],  # key
-                    args[1:] if len(args) > 1 else None,  # columns
-                    None  # values will be logged after successful execution
-                )
+            # Acquire every lock up front in a fixed order, so transactions can wait for each other's locks without deadlocking;
+            # the lock manager tracks the locks each transaction holds, so commit/abort release them by transaction id
+            for (table_name, key), lock_type in self._plan_locks():
 
-                # Determine lock type based on operation
-                if query.__name__ in ['select', 'sum']: lock_type = LockType.SHARED
-                else: lock_type = LockType.EXCLUSIVE
+                # Wait for a conflicting lock to be released; if it is not released in time, abort before changing anything
+                if not self._lock_manager.acquire_lock(table_name, key, self.transaction_id, lock_type, LOCK_WAIT_TIMEOUT): return self.abort()
 
-                # For operations that need a lock
-                if query.__name__ in ['select', 'update', 'delete', 'sum']:
+            # Bind the lookups used on every query
+            log_append, build_entry, transaction_id, modified_records = self._log_buf.append, self._logger.build_entry, self.transaction_id, self.modified_records
 
-                    # Get the key
-                    key = args[0]
-
-                    # If the lock is not acquired, abort
-                    if not self._lock_manager.acquire_lock(table.name, key, self.transaction_id, lock_type): 
-                        return self.abort()
+            # Iterate through the queries
+            for query, table, args, op in self.queries:
 
-                    # Add the lock to the acquired locks
-                    self.acquired_locks.add((table.name, key))
+                # Log the operation before execution, buffering the entry until commit/abort; reads change nothing, so they are not logged
+                if op > _SUM_VERSION:
+                    log_append(build_entry(
+                        transaction_id,
+                        query.__name__,
+                        table.name,
+                        args[0],  # key
+                        args[1:] if len(args) > 1 else None,  # columns
+                        None  # values will be logged after successful execution
+                    ))
 
                 # Save original state before modification
-                if query.__name__ == 'update': self._save_original_state(table, args[0], args[1:])
-                elif query.__name__ == 'delete': self._save_original_state(table, args[0], list(range(table.num_columns)))
+                if op == _UPDATE: self._save_original_state(table, args[0], args[1:])
+                elif op == _DELETE: self._save_original_state(table, args[0], list(range(table.num_columns)))
 
                 # Execute the query
                 result = query(*args)
@@ -102,10 +137,10 @@ class Transaction:
                 if result == False: return self.abort()
 
                 # Track modifications for potential rollback
-                if query.__name__ in ['update', 'delete']:
+                if op == _UPDATE or op == _DELETE:
 
                     # Add the modified record to the modified records
-                    self.modified_records.append((query, table, args))
+                    modified_records.append((op, table, args))
                     
                     # Create a version snapshot after modification
                     if hasattr(table, 'make_ver_copy'): table.make_ver_copy()
@@ -126,15 +161,16 @@ class Transaction:
         try:
 
             # Log the abort
-            self._logger.log_transaction(
+            self._log_buf.append(self._logger.build_entry(
                 self.transaction_id,
                 "abort",
                 None,
                 None
-            )
+            ))
             
-            # Rollback modifications in reverse order
-            for query, table, args in reversed(self.modified_records):
+            # Rollback modifications in reverse order, restoring a record updated more than once only once
+            original_values, restored = self._original_values(), set()
+            for op, table, args in reversed(self.modified_records):
 
                 # Get the key
                 key = args[0]
@@ -143,44 +179,47 @@ class Transaction:
                 state_key = (table.name, key)
                 
                 # If the state key is in the original values
-                if state_key in self.original_values:
+                if state_key in original_values:
 
                     # If the query is an update, restore the original values
-                    if query.__name__ == 'update':
+                    if op == _UPDATE and state_key not in restored:
 
-                        # Restore the original values
+                        # Restore the original values, keyed by the record's primary key as update expects
                         columns = [None] * table.num_columns
-                        for col, value in self.original_values[state_key].items():  columns[col] = value
+                        for col, value in original_values[state_key].items():  columns[col] = value
+                        columns[table.key_col] = key
 
                         # Update the table
-                        table.update(columns)
+                        table.update(columns); restored.add(state_key)
 
                     # If the query is a delete, unmark as deleted by restoring original record
-                    elif query.__name__ == 'delete':
+                    elif op == _DELETE:
 
                         # Restore the original values
                         columns = []
-                        for i in range(table.num_columns): columns.append(self.original_values[state_key].get(i))
+                        for i in range(table.num_columns): columns.append(original_values[state_key].get(i))
 
                         # Update the table
                         table.write(columns)
                         
                     # Log the rollback
-                    self._logger.log_transaction(
+                    self._log_buf.append(self._logger.build_entry(
                         self.transaction_id,
                         "rollback",
                         table.name,
                         key,
-                        list(self.original_values[state_key].keys()),
-                        list(self.original_values[state_key].values())
-                    )
+                        list(original_values[state_key].keys()),
+                        list(original_values[state_key].values())
+                    ))
         
         finally:
+            # Write the buffered log entries in one go
+            self._logger.log_entries(self._log_buf); self._log_buf.clear()
+
             # Release all locks
             self._lock_manager.release_all_locks(self.transaction_id)
-            self.acquired_locks.clear()
             self.modified_records.clear()
-            self.original_values.clear()
+            self._undo_keys.clear(); self._undo_vals.clear()
 
         # Return False
         return False
@@ -189,13 +228,14 @@ class Transaction:
         """
         Commits the transaction, making all changes permanent
         """
-        # Log the commit
-        self._logger.log_transaction(
+        # Log the commit, writing it with the buffered entries in one go
+        self._log_buf.append(self._logger.build_entry(
             self.transaction_id,
             "commit",
             None,
             None
-        )
+        ))
+        self._logger.log_entries(self._log_buf); self._log_buf.clear()
         
         # Create recovery point
         self._logger.log_recovery_point()
@@ -203,10 +243,9 @@ class Transaction:
         # Release all locks
         self._lock_manager.release_all_locks(self.transaction_id)
 
-        # Clear the acquired locks, modified records, and original values
-        self.acquired_locks.clear()
+        # Clear the modified records and original values
         self.modified_records.clear()
-        self.original_values.clear()
+        self._undo_keys.clear(); self._undo_vals.clear()
 
         # Return True   
         return True
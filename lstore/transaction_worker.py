@@ -1,18 +1,24 @@
-from threading import Thread
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import List
 from lstore.table import Table, Record
 from lstore.index import Index
 from lstore.transaction import Transaction
+from lstore.config import WORKER_POOL_SIZE
+
+# Threads shared by all workers; the pool starts threads as workers need them and reuses idle ones
+_pool = ThreadPoolExecutor(max_workers=WORKER_POOL_SIZE, thread_name_prefix='TransactionWorker')
 
 class TransactionWorker:
     """
-    Handles concurrent execution of transactions in a separate thread.
+    Handles concurrent execution of transactions on a thread from a shared pool.
     """
+    __slots__ = ('stats', 'transactions', 'result', '_future')
+
     def __init__(self, transactions: List[Transaction] = None):
         self.stats = []
         self.transactions = transactions or []
         self.result = 0
-        self._thread = None
+        self._future: Future = None
 
     def add_transaction(self, t: Transaction):
         """
@@ -22,16 +28,15 @@ class TransactionWorker:
 
     def run(self):
         """
-        Runs all transactions as a thread
+        Runs all transactions on a pooled thread
         """
-        self._thread = Thread(target=self.__run)
-        self._thread.start()
+        self._future = _pool.submit(self.__run)
 
     def join(self):
         """
-        Waits for the worker to finish
+        Waits for the worker to finish, re-raising any error its thread hit
         """
-        if self._thread: self._thread.join()
+        if self._future: self._future.result()
 
     def __run(self):
         """
@@ -44,6 +44,13 @@ run_test m3_tester_part_2.py
 run_test exam_tester_m3_part1.py
 run_test exam_tester_m3_part2.py
 
+# Regression Tests
+echo "======================================"
+echo "Running Regression Tests"
+echo "======================================"
+echo
+run_test testRegressions.py
+
 # Print footer
 echo "======================================"
 echo "All tests completed"
@@ -0,0 +1,303 @@
+from lstore.db import Database
+from lstore.query import Query
+from lstore.transaction import Transaction
+from lstore.transaction_worker import TransactionWorker
+from lstore.config import OFFSET_BITS, OFFSET_MASK
+
+import os
+import pickle
+import shutil
+import traceback
+from threading import Lock, get_ident
+
+path = './REG'
+
+def unpacked_directory_tester():
+    print("Checking tables saved with [page_num, offset] directory entries")
+    shutil.rmtree(path, ignore_errors=True)
+
+    # Write a table and keep a version snapshot of it
+    db = Database()
+    db.open(path)
+    grades_table = db.create_table('Grades', 5, 0)
+    query = Query(grades_table)
+    records = {}
+    for key in range(1000, 1300):
+        records[key] = [key, key % 7, key % 11, key % 13, 5]
+        query.insert(*records[key])
+    for key in range(1000, 1300, 3):
+        query.update(key, None, 99, None, None, None)
+        records[key][1] = 99
+    grades_table.make_ver_copy()
+    db.close()
+
+    # Rewrite the saved directories the way older tables stored them
+    unpack = lambda col_dirs: [{rid: [loc >> OFFSET_BITS, loc & OFFSET_MASK] for rid, loc in col.items()} for col in col_dirs]
+    pickle_path = os.path.join(path, 'tables.pickle')
+    with open(pickle_path, 'rb') as file: tables = pickle.load(file)
+    for table in tables.values():
+        table.page_directory = unpack(table.page_directory)
+        table.versions = [unpack(version) for version in table.versions]
+    with open(pickle_path, 'wb') as file: pickle.dump(tables, file)
+
+    # Reopen, update and select
+    db = Database()
+    db.open(path)
+    grades_table = db.get_table('Grades')
+    query = Query(grades_table)
+    for key in range(1000, 1300, 5):
+        query.update(key, None, None, 42, None, None)
+        records[key][2] = 42
+    errors = 0
+    for key in records:
+        record = query.select(key, 0, [1, 1, 1, 1, 1])[0]
+        if record.columns != records[key]:
+            errors += 1
+            print('select error on', key, ':', record.columns, ', correct:', records[key])
+    if query.sum(1000, 1299, 2) != sum(record[2] for record in records.values()):
+        errors += 1
+        print('sum error after reopening')
+    db.close()
+    shutil.rmtree(path, ignore_errors=True)
+    print("PASS" if errors == 0 else "Wrong: %d errors" % errors)
+
+def rollback_tester():
+    print("Checking rollback of updates to several records, columns and tables")
+    shutil.rmtree(path, ignore_errors=True)
+    db = Database()
+    db.open(path)
+    tables = [db.create_table('Grades', 5, 0), db.create_table('Courses', 4, 0)]
+    queries = [Query(table) for table in tables]
+    records = [{}, {}]
+    for t, (table, query) in enumerate(zip(tables, queries)):
+        for key in range(2000, 2020):
+            records[t][key] = [key] + [key % (i + 3) for i in range(1, table.num_columns)]
+            query.insert(*records[t][key])
+
+    # Update several columns of several records, one record twice and in both tables, then fail on a missing key
+    transaction = Transaction()
+    transaction.add_query(queries[0].update, tables[0], 2001, None, 50, 51, None, None)
+    transaction.add_query(queries[0].update, tables[0], 2002, None, None, 52, 53, 54)
+    transaction.add_query(queries[0].update, tables[0], 2001, None, None, None, 55, None)
+    transaction.add_query(queries[1].update, tables[1], 2003, None, 56, 57, 58)
+    transaction.add_query(queries[0].update, tables[0], 2004, None, 59, None, None, 60)
+    transaction.add_query(queries[1].update, tables[1], 2005, None, None, 61, None)
+    transaction.add_query(queries[0].update, tables[0], 9999, None, 62, None, None, None)
+    errors = 0
+    if transaction.run():
+        errors += 1
+        print('transaction committed, expected an abort')
+
+    # Every record should hold its original values again
+    for t, query in enumerate(queries):
+        for key, columns in records[t].items():
+            record = query.select(key, 0, [1] * len(columns))[0]
+            if record.columns != columns:
+                errors += 1
+                print('rollback error on', key, ':', record.columns, ', correct:', columns)
+    db.close()
+    shutil.rmtree(path, ignore_errors=True)
+    print("PASS" if errors == 0 else "Wrong: %d errors" % errors)
+
+def chain_cache_tester():
+    print("Checking cached indirection chains after tail RIDs are reused")
+    shutil.rmtree(path, ignore_errors=True)
+    db = Database()
+    db.open(path)
+    table = db.create_table('Chains', 3, 0)
+    query = Query(table)
+    for key in (1, 2, 3):
+        query.insert(key, 0, 0)
+    query.update(1, None, 5, None)
+
+    # Fill the preallocated pages so the next update of a record gets a new tail RID
+    for key in range(100, 9500):
+        query.insert(key, 0, 0)
+    query.update(1, None, 7, None)
+    table._chain_rids(1)
+
+    # Updating another record takes over the tail RID still held in the first record's cached chain
+    query.update(3, None, 8, None)
+    errors = 0
+    cached = list(table._chain_rids(1))
+    table._chain_cache.clear()
+    fresh = list(table._chain_rids(1))
+    if cached != fresh:
+        errors += 1
+        print('chain error on 1 :', cached, ', correct:', fresh)
+    db.close()
+    shutil.rmtree(path, ignore_errors=True)
+    print("PASS" if errors == 0 else "Wrong: %d errors" % errors)
+
+def version_snapshot_tester():
+    print("Checking that writes while a version is selected leave the version snapshot unchanged")
+    shutil.rmtree(path, ignore_errors=True)
+    db = Database()
+    db.open(path)
+    table = db.create_table('Versions', 3, 0)
+    query = Query(table)
+    for key in range(1, 6):
+        query.insert(key, 0, 0)
+    table.make_ver_copy()
+
+    # Updating after the snapshot gives the live table its own copy of the written columns
+    query.update(2, None, 5, None)
+    snapshot = [dict(col) for col in table.versions[0]]
+
+    # Write while the snapshot is selected, then switch back
+    table.select_version(0)
+    query.update(3, None, 9, None)
+    table.select_current()
+    errors = 0
+    if [dict(col) for col in table.versions[0]] != snapshot:
+        errors += 1
+        print('snapshot error: directory entries changed by a write in history mode')
+    record = query.select(2, 0, [1, 1, 1])[0]
+    if record.columns != [2, 5, 0]:
+        errors += 1
+        print('select error on 2 :', record.columns, ', correct:', [2, 5, 0])
+    db.close()
+    shutil.rmtree(path, ignore_errors=True)
+    print("PASS" if errors == 0 else "Wrong: %d errors" % errors)
+
+def worker_error_tester():
+    print("Checking that join re-raises an error from the worker's thread")
+    worker = TransactionWorker([None])
+    worker.run()
+    errors = 0
+    try:
+        worker.join()
+        errors += 1
+        print('join returned, expected the error from running a missing transaction')
+    except AttributeError:
+        pass
+    print("PASS" if errors == 0 else "Wrong: %d errors" % errors)
+
+class OwnedLock:
+    """
+    A lock that remembers which thread holds it
+    """
+    def __init__(self):
+        self._lock, self.owner = Lock(), None
+    def __enter__(self):
+        self.acquire()
+    def __exit__(self, *exc):
+        self.release()
+    def acquire(self):
+        self._lock.acquire()
+        self.owner = get_ident()
+    def release(self):
+        self.owner = None
+        self._lock.release()
+
+def concurrent_merge_tester():
+    print("Checking concurrent updates and a delete across a merge while every transaction takes a snapshot")
+    shutil.rmtree(path, ignore_errors=True)
+    db = Database()
+    db.open(path)
+    grades_table = db.create_table('Grades', 5, 0)
+    query = Query(grades_table)
+    records = {}
+    for key in range(3000, 3200):
+        records[key] = [key, 0, 0, 0, 0]
+        query.insert(*records[key])
+
+    # Fill the base pages, so the updates below write tail pages for the merge to fold back
+    for key in range(10000, 18000):
+        query.insert(key, 0, 0, 0, 0)
+
+    # Record every directory copy-on-write made without the column's lock held by the writing thread
+    unlocked = []
+    grades_table._dir_locks = [OwnedLock() for _ in grades_table._dir_locks]
+    own_dir = grades_table._own_dir
+    def checked_own_dir(col):
+        if grades_table._dir_locks[col].owner != get_ident(): unlocked.append(col)
+        return own_dir(col)
+    grades_table._own_dir = checked_own_dir
+
+    # Each worker updates its own keys, enough updates in total to trigger a merge; every transaction snapshots the table
+    workers = [TransactionWorker() for _ in range(4)]
+    for round in range(1, 13):
+        for key in records:
+            transaction = Transaction()
+            transaction.add_query(query.update, grades_table, key, None, round, None, None, key + round)
+            workers[key % len(workers)].add_transaction(transaction)
+            records[key][1], records[key][4] = round, key + round
+    transaction = Transaction()
+    transaction.add_query(query.delete, grades_table, 3199)
+    workers[0].add_transaction(transaction)
+    del records[3199]
+    for worker in workers:
+        worker.run()
+    for worker in workers:
+        worker.join()
+
+    # Every directory write should hold its column lock, and every record should hold its last update
+    del grades_table._own_dir
+    errors = 0
+    if unlocked:
+        errors += 1
+        print('lock error: %d directory writes without the column lock' % len(unlocked))
+    for key in records:
+        record = query.select(key, 0, [1, 1, 1, 1, 1])[0]
+        if record.columns != records[key]:
+            errors += 1
+            print('select error on', key, ':', record.columns, ', correct:', records[key])
+    if query.select(3199, 0, [1, 1, 1, 1, 1]):
+        errors += 1
+        print('select error on 3199 : deleted record found')
+    db.close()
+    shutil.rmtree(path, ignore_errors=True)
+    print("PASS" if errors == 0 else "Wrong: %d errors" % errors)
+
+def restarted_pages_tester():
+    print("Checking that pages loaded after reopening a table are saved by the table")
+    shutil.rmtree(path, ignore_errors=True)
+    db = Database()
+    db.open(path)
+    grades_table = db.create_table('Grades', 5, 0)
+    query = Query(grades_table)
+    records = {}
+    for key in range(4000, 4100):
+        records[key] = [key, key % 7, key % 11, key % 13, 5]
+        query.insert(*records[key])
+    db.close()
+
+    # Reopen and update; every dirty page should be the one the table holds in its page list
+    db = Database()
+    db.open(path)
+    grades_table = db.get_table('Grades')
+    query = Query(grades_table)
+    for key in range(4000, 4100, 4):
+        query.update(key, None, None, 77, None, None)
+        records[key][2] = 77
+    errors = 0
+    for (page_path, page_num, col), page in db.bufferpool.pages.items():
+        if page_path == grades_table.path and page.is_dirty and grades_table.page_range[col].get(page_num) is not page:
+            errors += 1
+            print('page list error on column', col, 'page', page_num, ': dirty page not held by the table')
+    db.close()
+
+    # Reopen and select
+    db = Database()
+    db.open(path)
+    query = Query(db.get_table('Grades'))
+    for key in records:
+        record = query.select(key, 0, [1, 1, 1, 1, 1])[0]
+        if record.columns != records[key]:
+            errors += 1
+            print('select error on', key, ':', record.columns, ', correct:', records[key])
+    db.close()
+    shutil.rmtree(path, ignore_errors=True)
+    print("PASS" if errors == 0 else "Wrong: %d errors" % errors)
+
+def run_test():
+    for tester in (unpacked_directory_tester, rollback_tester, chain_cache_tester, version_snapshot_tester, worker_error_tester, concurrent_merge_tester, restarted_pages_tester):
+        try:
+            tester()
+        except Exception as e:
+            print("Something went wrong")
+            print(e)
+            traceback.print_exc()
+
+run_test()